@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.routes import countries, cities, parameters, city_profiles, snapshots, sample_data
+from app.api.routes import countries, cities, parameters, city_profiles, snapshots, sample_data, analysis_jobs, cache, metrics, profiles
 
 router = APIRouter()
 
@@ -8,4 +8,8 @@ router.include_router(cities.router, prefix="/cities", tags=["cities"])
 router.include_router(parameters.router, prefix="/parameters", tags=["parameters"])
 router.include_router(city_profiles.router, prefix="/city-profiles", tags=["city profiles"])
 router.include_router(snapshots.router, prefix="/snapshots", tags=["snapshots"])
-router.include_router(sample_data.router, prefix="/import", tags=["sample data"])
\ No newline at end of file
+router.include_router(sample_data.router, prefix="/import", tags=["sample data"])
+router.include_router(analysis_jobs.router, prefix="/analysis-jobs", tags=["analysis jobs"])
+router.include_router(cache.router, prefix="/cache", tags=["cache"])
+router.include_router(metrics.router, tags=["metrics"])
+router.include_router(profiles.router, prefix="/profiles", tags=["profiling"])
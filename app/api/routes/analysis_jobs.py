@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException
+from typing import Dict, Any
+from bson import ObjectId
+from app.repositories import storage
+from app.utils.helpers import serialize_mongo_doc
+
+router = APIRouter()
+
+@router.get("/{job_id}", response_model=Dict[str, Any])
+async def get_analysis_job(job_id: str):
+    job = await storage.analysis_jobs.get(ObjectId(job_id))
+    if job:
+        return serialize_mongo_doc(job)
+    raise HTTPException(404, "Analysis job not found")
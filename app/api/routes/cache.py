@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+from app.services.analysis_cache import analysis_cache
+from app.services.baseline import baseline_store
+from app.services.read_cache import city_profile_cache, snapshot_cache, evaluator_cache
+
+router = APIRouter()
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_cache_stats():
+    return {
+        "city_profiles": city_profile_cache.stats(),
+        "snapshots": snapshot_cache.stats(),
+        "evaluators": evaluator_cache.stats(),
+        "analysis": analysis_cache.stats(),
+        "baselines": baseline_store.stats()
+    }
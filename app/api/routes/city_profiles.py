@@ -1,15 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from bson import ObjectId
-from app.models.schemas import CityProfileCreate
-from app.core.database import city_profiles_collection
-from app.utils.helpers import serialize_mongo_doc
+from app.core.config import IMPORT_BATCH_SIZE, IMPORT_MAX_BATCH_SIZE
+from app.models.schemas import CityProfileCreate, CityProfileUpdate
+from app.repositories import storage, DuplicateDocumentError
+from app.utils.helpers import serialize_mongo_doc, insert_documents
+from app.utils.pagination import list_documents
+from app.utils.responses import MongoJSONResponse
+from app.services.history import materialize_history
+from app.services.read_cache import city_profile_cache
 
 router = APIRouter()
 
-@router.post("/", response_model=Dict[str, Any])
-async def create_city_profile(profile: CityProfileCreate):
+def city_profile_document(profile: CityProfileCreate):
     profile_dict = profile.dict()
     profile_dict["city_id"] = ObjectId(profile_dict["city_id"])
     profile_dict["last_updated"] = datetime.now()
@@ -17,13 +21,100 @@ async def create_city_profile(profile: CityProfileCreate):
     for param in profile_dict["parameters"]:
         param["parameter_id"] = ObjectId(param["parameter_id"])
     
-    result = await city_profiles_collection.insert_one(profile_dict)
-    created_profile = await city_profiles_collection.find_one({"_id": result.inserted_id})
-    return serialize_mongo_doc(created_profile)
+    return profile_dict
+
+@router.post("/", response_model=Dict[str, Any])
+async def create_city_profile(profile: CityProfileCreate):
+    profile_dict = city_profile_document(profile)
+    try:
+        await storage.city_profiles.insert(profile_dict)
+    except DuplicateDocumentError:
+        raise HTTPException(409, "City profile already exists")
+    city_profile_cache.invalidate(profile_dict["city_id"])
+    await materialize_history([profile_dict])
+    return serialize_mongo_doc(profile_dict)
 
-@router.get("/{city_id}", response_model=Dict[str, Any])
+@router.post("/bulk", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def create_city_profiles(profiles: List[CityProfileCreate]):
+    documents = [city_profile_document(profile) for profile in profiles]
+    for document in documents:
+        city_profile_cache.invalidate(document["city_id"])
+    try:
+        created = await insert_documents(storage.city_profiles, documents)
+    except HTTPException as e:
+        failed = {error["index"] for error in e.detail["errors"]}
+        await materialize_history([document for i, document in enumerate(documents) if i not in failed])
+        raise
+    await materialize_history(created)
+    return MongoJSONResponse(created)
+
+@router.get("/history", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def get_country_history(
+    country_id: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    format: str = "json"
+):
+    """Historical analytics of every profiled city in a country, as materialized when the profiles were written.
+
+    Each document holds, per parameter, the number of historical terms,
+    first and last value, min, max, mean, CAGR and volatility (percent per
+    term) and the rolling means over HISTORY_ROLLING_WINDOW terms.
+    """
+    return await list_documents(storage.history_analytics, {"country_id": ObjectId(country_id)}, cursor, limit, None, format)
+
+@router.post("/history/rebuild", response_model=Dict[str, Any])
+async def rebuild_history(batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=IMPORT_MAX_BATCH_SIZE)):
+    """Recompute the historical analytics of every profile, e.g. after HISTORY_ROLLING_WINDOW changes."""
+    rebuilt = 0
+    after = None
+    while True:
+        profiles = await storage.city_profiles.find_page(
+            None, after, batch_size, {"city_id": 1, "parameters": 1, "last_updated": 1}
+        )
+        if not profiles:
+            break
+        await materialize_history(profiles)
+        rebuilt += len(profiles)
+        after = profiles[-1]["_id"]
+    
+    return {"profiles": rebuilt}
+
+@router.get("/{city_id}", response_model=Dict[str, Any], response_class=MongoJSONResponse)
 async def get_city_profile(city_id: str):
-    profile = await city_profiles_collection.find_one({"city_id": ObjectId(city_id)})
+    profile = await storage.city_profiles.get_by_city(ObjectId(city_id))
     if profile:
-        return serialize_mongo_doc(profile)
-    raise HTTPException(404, "City profile not found")
\ No newline at end of file
+        return MongoJSONResponse(profile)
+    raise HTTPException(404, "City profile not found")
+
+@router.get("/{city_id}/history", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def get_city_history(city_id: str):
+    """Historical analytics of one city's profile; see GET /city-profiles/history."""
+    history = await storage.history_analytics.get(ObjectId(city_id))
+    if history:
+        return MongoJSONResponse(history)
+    
+    # Profiles stored before analytics were materialized are summarized on first read
+    profile = await storage.city_profiles.get_by_city(ObjectId(city_id))
+    if not profile:
+        raise HTTPException(404, "City profile not found")
+    documents = await materialize_history([profile])
+    return MongoJSONResponse(documents[0])
+
+@router.put("/{city_id}", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def update_city_profile(city_id: str, profile: CityProfileUpdate):
+    existing = await storage.city_profiles.get_by_city(ObjectId(city_id))
+    if not existing:
+        raise HTTPException(404, "City profile not found")
+    
+    update_fields = profile.dict()
+    update_fields["last_updated"] = datetime.now()
+    for param in update_fields["parameters"]:
+        param["parameter_id"] = ObjectId(param["parameter_id"])
+    
+    await storage.city_profiles.update(existing["_id"], update_fields)
+    city_profile_cache.invalidate(existing["city_id"])
+    updated = {**existing, **update_fields}
+    await materialize_history([updated])
+    
+    return MongoJSONResponse(updated)
@@ -1,26 +1,37 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Dict, Any, Optional
 from bson import ObjectId
 from app.models.schemas import CountryCreate
-from app.core.database import countries_collection
-from app.utils.helpers import serialize_mongo_doc
+from app.repositories import storage
+from app.utils.helpers import serialize_mongo_doc, insert_documents
+from app.utils.pagination import list_documents, parse_projection
+from app.utils.responses import MongoJSONResponse
 
 router = APIRouter()
 
 @router.post("/", response_model=Dict[str, Any])
 async def create_country(country: CountryCreate):
-    result = await countries_collection.insert_one(country.dict())
-    created_country = await countries_collection.find_one({"_id": result.inserted_id})
-    return serialize_mongo_doc(created_country)
+    country_dict = country.dict()
+    await storage.countries.insert(country_dict)
+    return serialize_mongo_doc(country_dict)
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def get_countries():
-    countries = await countries_collection.find().to_list(100)
-    return [serialize_mongo_doc(country) for country in countries]
+@router.post("/bulk", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def create_countries(countries: List[CountryCreate]):
+    created = await insert_documents(storage.countries, [country.dict() for country in countries])
+    return MongoJSONResponse(created)
+
+@router.get("/", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def get_countries(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    format: str = "json"
+):
+    return await list_documents(storage.countries, {}, cursor, limit, parse_projection(fields), format)
 
 @router.get("/{country_id}", response_model=Dict[str, Any])
 async def get_country(country_id: str):
-    country = await countries_collection.find_one({"_id": ObjectId(country_id)})
+    country = await storage.countries.get(ObjectId(country_id))
     if country:
         return serialize_mongo_doc(country)
     raise HTTPException(404, "Country not found")
\ No newline at end of file
@@ -1,22 +1,39 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 from typing import List, Dict, Any, Optional
 from app.models.schemas import EconomicParameterCreate
-from app.core.database import economic_parameters_collection
-from app.utils.helpers import serialize_mongo_doc
+from app.repositories import storage
+from app.utils.helpers import serialize_mongo_doc, insert_documents
+from app.utils.pagination import list_documents, parse_projection
+from app.utils.responses import MongoJSONResponse
+from app.services.parameter_catalog import parameter_catalog
 
 router = APIRouter()
 
 @router.post("/", response_model=Dict[str, Any])
 async def create_parameter(parameter: EconomicParameterCreate):
-    result = await economic_parameters_collection.insert_one(parameter.dict())
-    created_parameter = await economic_parameters_collection.find_one({"_id": result.inserted_id})
-    return serialize_mongo_doc(created_parameter)
+    parameter_dict = parameter.dict()
+    await storage.parameters.insert(parameter_dict)
+    parameter_catalog.invalidate()
+    return serialize_mongo_doc(parameter_dict)
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def get_parameters(category: Optional[str] = None):
+@router.post("/bulk", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def create_parameters(parameters: List[EconomicParameterCreate]):
+    try:
+        created = await insert_documents(storage.parameters, [parameter.dict() for parameter in parameters])
+    finally:
+        parameter_catalog.invalidate()
+    return MongoJSONResponse(created)
+
+@router.get("/", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def get_parameters(
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    format: str = "json"
+):
     filter_query = {}
     if category:
         filter_query["category"] = category
     
-    parameters = await economic_parameters_collection.find(filter_query).to_list(100)
-    return [serialize_mongo_doc(param) for param in parameters]
\ No newline at end of file
+    return await list_documents(storage.parameters, filter_query, cursor, limit, parse_projection(fields), format)
\ No newline at end of file
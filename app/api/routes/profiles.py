@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import List, Dict, Any
+from app.services.profiling import profile_store, top_functions, diff_stats, PROFILE_SORT_KEYS
+
+router = APIRouter()
+
+@router.get("/", response_model=List[Dict[str, Any]])
+async def list_profiles():
+    """Stored request profiles, newest first."""
+    return profile_store.list()
+
+@router.get("/diff", response_model=Dict[str, Any])
+async def diff_profiles(base: str, other: str, limit: int = Query(50, ge=1)):
+    """Functions whose cumulative time differs most between profile `base` and profile `other`."""
+    base_stats = profile_store.stats(base)
+    other_stats = profile_store.stats(other)
+    if base_stats is None or other_stats is None:
+        raise HTTPException(404, "Profile not found")
+
+    return {
+        "base": profile_store.get(base),
+        "other": profile_store.get(other),
+        "functions": diff_stats(base_stats, other_stats, limit)
+    }
+
+@router.get("/{profile_id}", response_model=Dict[str, Any])
+async def get_profile(profile_id: str, sort: str = "cumulative", limit: int = Query(30, ge=1)):
+    if sort not in PROFILE_SORT_KEYS:
+        raise HTTPException(400, f"sort must be one of {', '.join(PROFILE_SORT_KEYS)}")
+
+    stats = profile_store.stats(profile_id)
+    if stats is None:
+        raise HTTPException(404, "Profile not found")
+
+    return {**profile_store.get(profile_id), "functions": top_functions(stats, sort, limit)}
+
+@router.get("/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """The raw pstats dump, for snakeviz or `python -m pstats`."""
+    if profile_store.get(profile_id) is None:
+        raise HTTPException(404, "Profile not found")
+    return FileResponse(
+        profile_store.path(profile_id, "prof"), media_type="application/octet-stream", filename=f"{profile_id}.prof"
+    )
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from datetime import datetime
 import random
 from bson import ObjectId
-from app.core.database import countries_collection, cities_collection, economic_parameters_collection, city_profiles_collection, snapshots_collection
+from app.repositories import storage
+from app.services.parameter_catalog import parameter_catalog
+from app.services.read_cache import city_profile_cache, snapshot_cache
+from app.services.bulk_import import import_stream
+from app.services.history import materialize_history
+from app.core.config import IMPORT_BATCH_SIZE, IMPORT_MAX_BATCH_SIZE
 
 router = APIRouter()
 
@@ -10,11 +15,14 @@ router = APIRouter()
 async def import_sample_data():
     try:
         # Clear existing data
-        await countries_collection.delete_many({})
-        await cities_collection.delete_many({})
-        await economic_parameters_collection.delete_many({})
-        await city_profiles_collection.delete_many({})
-        await snapshots_collection.delete_many({})
+        await storage.countries.delete_all()
+        await storage.cities.delete_all()
+        await storage.parameters.delete_all()
+        await storage.city_profiles.delete_all()
+        await storage.snapshots.delete_all()
+        await storage.history_analytics.delete_all()
+        city_profile_cache.clear()
+        snapshot_cache.clear()
         
         # Import sample countries
         countries = [
@@ -34,8 +42,8 @@ async def import_sample_data():
         
         country_ids = {}
         for country in countries:
-            result = await countries_collection.insert_one(country)
-            country_ids[country["code"]] = result.inserted_id
+            await storage.countries.insert(country)
+            country_ids[country["code"]] = country["_id"]
         
         # Import sample cities
         cities = [
@@ -64,8 +72,8 @@ async def import_sample_data():
         
         city_ids = {}
         for city in cities:
-            result = await cities_collection.insert_one(city)
-            city_ids[city["name"]] = result.inserted_id
+            await storage.cities.insert(city)
+            city_ids[city["name"]] = city["_id"]
         
         # Import sample economic parameters
         parameters = [
@@ -143,10 +151,13 @@ async def import_sample_data():
         
         parameter_ids = {}
         for param in parameters:
-            result = await economic_parameters_collection.insert_one(param)
-            parameter_ids[param["code"]] = result.inserted_id
+            await storage.parameters.insert(param)
+            parameter_ids[param["code"]] = param["_id"]
+        
+        parameter_catalog.invalidate()
         
         # Create city profiles with historical data
+        city_profiles = []
         for city_name, city_id in city_ids.items():
             # Different base values for each city
             if city_name == "New York":
@@ -251,7 +262,10 @@ async def import_sample_data():
                 "summary": summary
             }
             
-            await city_profiles_collection.insert_one(city_profile)
+            await storage.city_profiles.insert(city_profile)
+            city_profiles.append(city_profile)
+        
+        await materialize_history(city_profiles)
         
         # Create a sample snapshot for New York
         ny_snapshot = {
@@ -297,10 +311,11 @@ async def import_sample_data():
                 }
             ],
             "results": [],
+            "results_count": 0,
             "is_completed": False
         }
         
-        await snapshots_collection.insert_one(ny_snapshot)
+        await storage.snapshots.insert(ny_snapshot)
         
         return {
             "message": "Sample data imported successfully",
@@ -313,4 +328,31 @@ async def import_sample_data():
             }
         }
     except Exception as e:
-        raise HTTPException(500, f"Error importing sample data: {str(e)}")
\ No newline at end of file
+        raise HTTPException(500, f"Error importing sample data: {str(e)}")
+
+@router.post("/bulk/{kind}")
+async def bulk_import(
+    kind: str,
+    request: Request,
+    format: str = "ndjson",
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=IMPORT_MAX_BATCH_SIZE)
+):
+    """Stream an NDJSON or CSV body of countries, cities, parameters or city_profiles into storage.
+
+    References use codes and names: cities give `country_code`, profiles give
+    `city` (plus `country_code` when the name is ambiguous) and
+    `parameter_code`. CSV profiles are one row per historical term with the
+    columns city, country_code, parameter_code, base_value,
+    default_growth_rate, term, value, growth_rate and date, grouped by city.
+    """
+    try:
+        report = await import_stream(kind, request.stream(), format, batch_size)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    if kind == "parameters":
+        parameter_catalog.invalidate()
+    if kind == "city_profiles":
+        city_profile_cache.clear()
+    
+    return report
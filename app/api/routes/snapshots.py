@@ -1,112 +1,321 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
+import asyncio
+import time
 from datetime import datetime
 from bson import ObjectId
-from app.models.schemas import SnapshotCreate, SimulationAdvance
-from app.core.database import snapshots_collection, city_profiles_collection
-from app.utils.helpers import serialize_mongo_doc
-from app.services.simulation import calculate_economic_health
-from app.services.ai_analysis import generate_ai_analysis
+from app.models.schemas import (
+    SnapshotCreate, SnapshotUpdate, SimulationAdvance, MonteCarloRequest, PolicySimulationRequest, SweepRequest, OptimizeRequest,
+    SnapshotCompareRequest
+)
+from app.repositories import storage
+from app.utils.helpers import serialize_mongo_doc, insert_documents
+from app.utils.pagination import list_documents, parse_projection
+from app.utils.responses import MongoJSONResponse, encode_events, public_id
+from app.services.simulation import (
+    run_simulation, run_monte_carlo, load_health_evaluator, load_health_evaluators,
+    run_batch_simulation, build_term_results, SweepPlan, StageRateKernel, apply_stage_rates, optimize_stage_rates,
+    cursor_state
+)
+from app.core.config import (
+    MONTE_CARLO_BLOCK_ELEMENTS, SWEEP_MAX_POINTS, OPTIMIZER_MAX_EVALUATIONS, STREAM_BLOCK_TERMS, STREAM_ANALYSIS_TIMEOUT
+)
+from app.services.analysis_jobs import analysis_jobs
+from app.services.baseline import baseline_store, baseline_comparison
+from app.services.comparison import comparison_projection, compare_results
+from app.services.sweep import sweep_runner
+from app.services.simulation_stream import stream_simulation
+from app.services.read_cache import city_profile_cache, snapshot_cache
 
 router = APIRouter()
 
-@router.post("/", response_model=Dict[str, Any])
-async def create_snapshot(snapshot: SnapshotCreate):
+SNAPSHOT_SUMMARY_PROJECTION = {"results": 0, "cursor": 0, "ai_analysis": 0}
+
+def stage_documents(stages):
+    stage_dicts = [stage.dict() for stage in stages]
+    for stage in stage_dicts:
+        for param in stage["parameters"]:
+            param["parameter_id"] = ObjectId(param["parameter_id"])
+    return stage_dicts
+
+def snapshot_document(snapshot: SnapshotCreate):
     snapshot_dict = snapshot.dict()
     snapshot_dict["city_id"] = ObjectId(snapshot_dict["city_id"])
     snapshot_dict["created_at"] = datetime.now()
     snapshot_dict["is_completed"] = False
     snapshot_dict["results"] = []
+    snapshot_dict["results_count"] = 0
+    snapshot_dict["stages"] = stage_documents(snapshot.stages)
     
-    for stage in snapshot_dict["stages"]:
-        for param in stage["parameters"]:
-            param["parameter_id"] = ObjectId(param["parameter_id"])
+    return snapshot_dict
+
+@router.post("/", response_model=Dict[str, Any])
+async def create_snapshot(snapshot: SnapshotCreate):
+    snapshot_dict = snapshot_document(snapshot)
+    await storage.snapshots.insert(snapshot_dict)
+    return serialize_mongo_doc(snapshot_dict)
+
+@router.post("/bulk", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def create_snapshots(snapshots: List[SnapshotCreate]):
+    created = await insert_documents(storage.snapshots, [snapshot_document(snapshot) for snapshot in snapshots])
+    return MongoJSONResponse(created)
+
+@router.post("/batch-simulate", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def batch_simulate(request: PolicySimulationRequest):
+    """Apply one stage plan to every city of a country, or to a list of cities, and rank the outcomes.
+
+    All profiles are fetched with one query and simulated in one array
+    computation. Nothing is stored unless `persist` is set; each city then
+    gets a completed snapshot, without an AI analysis (re-running /simulate
+    on it adds one).
+    """
+    if bool(request.country_id) == bool(request.city_ids):
+        raise HTTPException(400, "Provide either country_id or city_ids")
     
-    result = await snapshots_collection.insert_one(snapshot_dict)
-    created_snapshot = await snapshots_collection.find_one({"_id": result.inserted_id})
-    return serialize_mongo_doc(created_snapshot)
+    stages = stage_documents(request.stages)
+    if sum(stage["terms"] for stage in stages) < 1:
+        raise HTTPException(400, "The stage plan has no terms")
+    
+    if request.country_id:
+        cities = await storage.cities.find_page({"country_id": ObjectId(request.country_id)}, projection={"name": 1})
+        requested_ids = [city["_id"] for city in cities]
+    else:
+        requested_ids = list(dict.fromkeys(ObjectId(city_id) for city_id in request.city_ids))
+        cities = await storage.cities.find_in("_id", requested_ids, {"name": 1})
+    
+    city_names = {city["_id"]: city["name"] for city in cities}
+    profiles = await storage.city_profiles.find_in("city_id", list(city_names))
+    if not profiles:
+        raise HTTPException(404, "No city profiles found")
+    
+    evaluators = await load_health_evaluators(profiles)
+    parameter_ids, growth_rates, values, health_scores, rows = run_batch_simulation(evaluators, stages)
+    
+    snapshot_ids = {}
+    if request.persist:
+        snapshots = []
+        for c, profile in enumerate(profiles):
+            results = build_term_results(
+                [parameter_ids[row] for row in rows[c]], values[c, rows[c]], growth_rates[rows[c]], health_scores[c]
+            )
+            snapshots.append({
+                "name": request.name or "Policy simulation",
+                "city_id": profile["city_id"],
+                "created_at": datetime.now(),
+                "stages": stages,
+                "results": results,
+                "results_count": len(results),
+                "cursor": cursor_state(results[-1]),
+                "ai_analysis": None,
+                "is_completed": True
+            })
+        await insert_documents(storage.snapshots, snapshots)
+        snapshot_ids = {snapshot["city_id"]: snapshot["_id"] for snapshot in snapshots}
+    
+    final_scores = health_scores[:, -1].tolist()
+    final_values = values[:, :, -1].tolist()
+    rankings = []
+    for rank, c in enumerate(sorted(range(len(profiles)), key=lambda c: final_scores[c], reverse=True), 1):
+        city_id = profiles[c]["city_id"]
+        ranking = {
+            "rank": rank,
+            "city_id": city_id,
+            "city_name": city_names.get(city_id),
+            "final_health_score": final_scores[c],
+            "health_scores": health_scores[c].tolist(),
+            "final_values": [
+                {"parameter_id": parameter_ids[row], "value": round(final_values[c][row], 2)}
+                for row in rows[c]
+            ]
+        }
+        if city_id in snapshot_ids:
+            ranking["snapshot_id"] = snapshot_ids[city_id]
+        rankings.append(ranking)
+    
+    simulated = {profile["city_id"] for profile in profiles}
+    return MongoJSONResponse({
+        "terms": health_scores.shape[1],
+        "cities": len(rankings),
+        "missing_city_ids": [city_id for city_id in requested_ids if city_id not in simulated],
+        "rankings": rankings
+    })
+
+@router.post("/compare", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def compare_snapshots(request: SnapshotCompareRequest):
+    """Compare the results of several snapshots term by term, against the first one.
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def get_snapshots(city_id: Optional[str] = None):
+    All snapshots are fetched with one query that only reads the result
+    fields the requested `fields` need, and come back as aligned arrays.
+    """
+    if not all(ObjectId.is_valid(snapshot_id) for snapshot_id in request.snapshot_ids):
+        raise HTTPException(400, "Invalid snapshot id")
+    snapshot_ids = list(dict.fromkeys(ObjectId(snapshot_id) for snapshot_id in request.snapshot_ids))
+    if len(snapshot_ids) < 2:
+        raise HTTPException(400, "Provide at least two different snapshots")
+    
+    found = await storage.snapshots.find_in("_id", snapshot_ids, comparison_projection(request.fields))
+    snapshots = {snapshot["_id"]: snapshot for snapshot in found}
+    missing = [str(snapshot_id) for snapshot_id in snapshot_ids if snapshot_id not in snapshots]
+    if missing:
+        raise HTTPException(404, f"Snapshots not found: {', '.join(missing)}")
+    snapshots = [snapshots[snapshot_id] for snapshot_id in snapshot_ids]
+    
+    comparison = compare_results(
+        snapshots, request.parameter_ids or None, request.fields, request.divergence_threshold
+    )
+    return MongoJSONResponse({
+        "snapshots": [
+            {"id": snapshot["_id"], "name": snapshot.get("name"), "city_id": snapshot.get("city_id"),
+             "terms": len(snapshot.get("results") or [])}
+            for snapshot in snapshots
+        ],
+        **comparison
+    })
+
+@router.get("/", response_model=List[Dict[str, Any]], response_class=MongoJSONResponse)
+async def get_snapshots(
+    city_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = None,
+    format: str = "json"
+):
     filter_query = {}
     if city_id:
         filter_query["city_id"] = ObjectId(city_id)
     
-    snapshots = await snapshots_collection.find(filter_query).to_list(100)
-    return [serialize_mongo_doc(snapshot) for snapshot in snapshots]
+    # Listings leave out the heavy result payloads unless fields= asks for them
+    projection = parse_projection(fields, default=SNAPSHOT_SUMMARY_PROJECTION)
+    return await list_documents(storage.snapshots, filter_query, cursor, limit, projection, format)
 
-@router.get("/{snapshot_id}", response_model=Dict[str, Any])
+@router.get("/{snapshot_id}", response_model=Dict[str, Any], response_class=MongoJSONResponse)
 async def get_snapshot(snapshot_id: str):
-    snapshot = await snapshots_collection.find_one({"_id": ObjectId(snapshot_id)})
+    snapshot = await storage.snapshots.get(ObjectId(snapshot_id))
     if snapshot:
-        return serialize_mongo_doc(snapshot)
+        return MongoJSONResponse(snapshot)
     raise HTTPException(404, "Snapshot not found")
 
-@router.post("/{snapshot_id}/simulate", response_model=Dict[str, Any])
+@router.get("/{snapshot_id}/baseline", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def compare_snapshot_to_baseline(snapshot_id: str):
+    """Per-term deltas of the snapshot's stored results against its city's default-growth baseline.
+
+    The baseline is simulated once per profile version and reused, so this
+    never re-runs the snapshot or the baseline simulation.
+    """
+    snapshot = await storage.snapshots.get(ObjectId(snapshot_id), {"city_id": 1, "results": 1})
+    if not snapshot:
+        raise HTTPException(404, "Snapshot not found")
+    
+    city_profile = await city_profile_cache.get(snapshot["city_id"])
+    if not city_profile:
+        raise HTTPException(404, "City profile not found")
+    
+    results = snapshot.get("results") or []
+    evaluator = await load_health_evaluator(city_profile)
+    baseline = await baseline_store.get(evaluator, city_profile, max((r["term"] for r in results), default=0))
+    
+    return MongoJSONResponse({"snapshot_id": snapshot["_id"], **baseline_comparison(baseline, results)})
+
+@router.put("/{snapshot_id}", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def update_snapshot(snapshot_id: str, snapshot_update: SnapshotUpdate):
+    snapshot = await storage.snapshots.get(ObjectId(snapshot_id), SNAPSHOT_SUMMARY_PROJECTION)
+    if not snapshot:
+        raise HTTPException(404, "Snapshot not found")
+    
+    update_fields = {}
+    if snapshot_update.name is not None:
+        update_fields["name"] = snapshot_update.name
+    if snapshot_update.stages is not None:
+        # Results of the old plan no longer apply; the job id reset also keeps
+        # a still-running analysis of the old plan from landing on it
+        update_fields.update({
+            "stages": stage_documents(snapshot_update.stages),
+            "results": [],
+            "results_count": 0,
+            "cursor": None,
+            "ai_analysis": None,
+            "ai_analysis_job_id": None,
+            "is_completed": False
+        })
+    
+    if update_fields:
+        await storage.snapshots.update(snapshot["_id"], update_fields)
+        snapshot_cache.invalidate(snapshot["_id"])
+    
+    return MongoJSONResponse({**snapshot, **update_fields})
+
+@router.post("/{snapshot_id}/simulate", response_model=Dict[str, Any], response_class=MongoJSONResponse)
 async def simulate_snapshot(snapshot_id: str):
-    snapshot = await snapshots_collection.find_one({"_id": ObjectId(snapshot_id)})
+    snapshot = await snapshot_cache.get(ObjectId(snapshot_id))
     if not snapshot:
         raise HTTPException(404, "Snapshot not found")
     
-    city_profile = await city_profiles_collection.find_one({"city_id": snapshot["city_id"]})
+    city_profile = await city_profile_cache.get(snapshot["city_id"])
     if not city_profile:
         raise HTTPException(404, "City profile not found")
     
-    current_values = {}
-    for param in city_profile["parameters"]:
-        current_values[str(param["parameter_id"])] = param["base_value"]
+    evaluator = await load_health_evaluator(city_profile)
+    results = run_simulation(evaluator, snapshot["stages"])
     
-    results = []
-    term_counter = 1
+    job_id = ObjectId()
     
-    for stage in snapshot["stages"]:
-        growth_rates = {}
-        for param in stage["parameters"]:
-            growth_rates[str(param["parameter_id"])] = param["growth_rate"]
-        
-        for t in range(stage["terms"]):
-            term_result = {
-                "term": term_counter,
-                "parameters": []
-            }
-            
-            for param_id, current_value in current_values.items():
-                growth_rate = growth_rates.get(param_id, 0)
-                
-                new_value = (1 + growth_rate / 100) * current_value
-                current_values[param_id] = new_value
-                
-                term_result["parameters"].append({
-                    "parameter_id": ObjectId(param_id),
-                    "value": round(new_value, 2),
-                    "growth_rate": growth_rate
-                })
-            
-            term_result["economic_health_score"] = calculate_economic_health(term_result["parameters"], city_profile)
-            
-            results.append(term_result)
-            term_counter += 1
-    
-    ai_analysis = await generate_ai_analysis(snapshot, city_profile, results)
-    
-    update_result = await snapshots_collection.update_one(
-        {"_id": ObjectId(snapshot_id)},
-        {"$set": {
-            "results": results,
-            "ai_analysis": ai_analysis,
-            "is_completed": True
-        }}
-    )
+    update_fields = {
+        "results": results,
+        "results_count": len(results),
+        "cursor": cursor_state(results[-1]) if results else None,
+        "ai_analysis": None,
+        "ai_analysis_job_id": job_id,
+        "is_completed": True
+    }
+    await storage.snapshots.update(snapshot["_id"], update_fields)
+    
+    await analysis_jobs.submit(job_id, snapshot, city_profile, results)
     
-    updated_snapshot = await snapshots_collection.find_one({"_id": ObjectId(snapshot_id)})
-    return serialize_mongo_doc(updated_snapshot)
+    return MongoJSONResponse({**snapshot, **update_fields})
 
-@router.post("/{snapshot_id}/advance", response_model=Dict[str, Any])
-async def advance_simulation(snapshot_id: str, advance: SimulationAdvance):
-    snapshot = await snapshots_collection.find_one({"_id": ObjectId(snapshot_id)})
+@router.post("/{snapshot_id}/simulate/stream")
+async def simulate_snapshot_stream(
+    snapshot_id: str,
+    format: str = "sse",
+    block_terms: int = Query(STREAM_BLOCK_TERMS, ge=1)
+):
+    """Run /simulate as a stream of `block_terms`-sized result blocks, then the AI analysis.
+
+    With format=sse the events are server-sent events (`results`,
+    `completed`, then `analysis` or `analysis_pending`); with format=ndjson
+    each line is `{"event": ..., "data": ...}`.
+    """
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(400, "format must be sse or ndjson")
+    
+    snapshot = await snapshot_cache.get(ObjectId(snapshot_id))
     if not snapshot:
         raise HTTPException(404, "Snapshot not found")
     
+    city_profile = await city_profile_cache.get(snapshot["city_id"])
+    if not city_profile:
+        raise HTTPException(404, "City profile not found")
+    
+    evaluator = await load_health_evaluator(city_profile)
+    events = stream_simulation(snapshot, city_profile, evaluator, block_terms, STREAM_ANALYSIS_TIMEOUT)
+    
+    if format == "sse":
+        return StreamingResponse(
+            encode_events(events, "sse"),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    return StreamingResponse(encode_events(events, "ndjson"), media_type="application/x-ndjson")
+
+@router.post("/{snapshot_id}/advance", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def advance_simulation(snapshot_id: str, advance: SimulationAdvance, include_snapshot: bool = False):
+    definition = await snapshot_cache.get(ObjectId(snapshot_id))
+    state = await storage.snapshots.get(ObjectId(snapshot_id), {"results_count": 1, "cursor": 1})
+    if not definition or not state:
+        raise HTTPException(404, "Snapshot not found")
+    snapshot = {**definition, **state}
+    
     current_term = advance.current_term
     current_stage = None
     term_offset = 0
@@ -120,69 +329,249 @@ async def advance_simulation(snapshot_id: str, advance: SimulationAdvance):
     if not current_stage:
         raise HTTPException(400, "Simulation has reached its end")
     
-    city_profile = await city_profiles_collection.find_one({"city_id": snapshot["city_id"]})
+    city_profile = await city_profile_cache.get(snapshot["city_id"])
     if not city_profile:
         raise HTTPException(404, "City profile not found")
     
-    current_values = {}
-    if current_term > 1 and "results" in snapshot and len(snapshot["results"]) >= current_term - 1:
-        prev_term_result = snapshot["results"][current_term - 2]
-        for param in prev_term_result["parameters"]:
-            current_values[str(param["parameter_id"])] = param["value"]
-    else:
-        for param in city_profile["parameters"]:
-            current_values[str(param["parameter_id"])] = param["base_value"]
+    results_count = snapshot.get("results_count")
+    if results_count is None:
+        results_count = await storage.snapshots.count_results(snapshot["_id"])
+        # Snapshots stored before results_count existed get it once; appends increment it from there
+        await storage.snapshots.update(snapshot["_id"], {"results_count": results_count}, match={"results_count": None})
+    
+    start_values = None
+    if current_term > 1 and results_count >= current_term - 1:
+        cursor = snapshot.get("cursor")
+        if cursor and cursor["term"] == current_term - 1:
+            prev_term_result = cursor
+        else:
+            prev_term_result = await storage.snapshots.get_result(snapshot["_id"], current_term - 2)
+        prev_values = {str(param["parameter_id"]): param["value"] for param in prev_term_result["parameters"]}
+        start_values = [
+            prev_values.get(str(param["parameter_id"]), param["base_value"])
+            for param in city_profile["parameters"]
+        ]
+    
+    step = {"terms": 1, "parameters": current_stage["parameters"]}
+    evaluator = await load_health_evaluator(city_profile)
+    term_result = run_simulation(evaluator, [step], start_values, first_term=current_term)[0]
+    
+    total_terms = sum(stage["terms"] for stage in snapshot["stages"])
+    is_completed = current_term >= total_terms
     
-    growth_rates = {}
-    for param in current_stage["parameters"]:
-        growth_rates[str(param["parameter_id"])] = param["growth_rate"]
+    update_fields = {"cursor": cursor_state(term_result), "is_completed": is_completed}
+    result_index = current_term - 1 if current_term <= results_count else None
+    
+    if is_completed:
+        job_id = ObjectId()
+        update_fields["ai_analysis"] = None
+        update_fields["ai_analysis_job_id"] = job_id
     
-    term_result = {
-        "term": current_term,
-        "parameters": []
+    await storage.snapshots.write_result(snapshot["_id"], term_result, update_fields, index=result_index)
+    
+    response = {
+        "snapshot_id": snapshot_id,
+        "term": term_result,
+        "is_completed": is_completed
     }
     
-    for param_id, current_value in current_values.items():
-        growth_rate = growth_rates.get(param_id, 0)
-        
-        new_value = (1 + growth_rate / 100) * current_value
-        
-        term_result["parameters"].append({
-            "parameter_id": ObjectId(param_id),
-            "value": round(new_value, 2),
-            "growth_rate": growth_rate
+    if is_completed:
+        stored = await storage.snapshots.get(snapshot["_id"], {"results": 1})
+        await analysis_jobs.submit(job_id, snapshot, city_profile, stored["results"])
+        response["ai_analysis_job_id"] = str(job_id)
+    
+    if include_snapshot:
+        updated_snapshot = await storage.snapshots.get(snapshot["_id"])
+        # Nested, so dumps_mongo would not rename its _id by itself
+        response["snapshot"] = public_id(updated_snapshot)
+    
+    return MongoJSONResponse(response)
+
+@router.post("/{snapshot_id}/monte-carlo", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def monte_carlo_snapshot(snapshot_id: str, request: MonteCarloRequest):
+    snapshot = await snapshot_cache.get(ObjectId(snapshot_id))
+    if not snapshot:
+        raise HTTPException(404, "Snapshot not found")
+    
+    city_profile = await city_profile_cache.get(snapshot["city_id"])
+    if not city_profile:
+        raise HTTPException(404, "City profile not found")
+    
+    try:
+        evaluator = await load_health_evaluator(city_profile)
+        # Up to MONTE_CARLO_MAX_PATHS paths take seconds of NumPy work, which
+        # must not hold up the event loop
+        parameter_ids, value_bands, health_bands = await asyncio.to_thread(
+            run_monte_carlo,
+            evaluator,
+            snapshot["stages"],
+            [dist.dict() for dist in request.distributions],
+            request.paths,
+            seed=request.seed,
+            percentiles=request.percentiles,
+            block_elements=MONTE_CARLO_BLOCK_ELEMENTS
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    labels = [f"p{q:g}" for q in request.percentiles]
+    value_bands = value_bands.round(2).tolist()
+    health_bands = health_bands.round(2).tolist()
+    
+    return MongoJSONResponse({
+        "snapshot_id": snapshot_id,
+        "paths": request.paths,
+        "seed": request.seed,
+        "terms": len(health_bands[0]),
+        "parameters": [
+            {
+                "parameter_id": str(param_id),
+                "bands": {label: value_bands[q][i] for q, label in enumerate(labels)}
+            }
+            for i, param_id in enumerate(parameter_ids)
+        ],
+        "economic_health_score": {label: health_bands[q] for q, label in enumerate(labels)}
+    })
+
+@router.post("/{snapshot_id}/sweep", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def sweep_snapshot(snapshot_id: str, request: SweepRequest):
+    """Final health score over a grid of stage growth rates, plus one-at-a-time sensitivities.
+
+    `surface` is nested in axis order (surface[i][j] is the score at the i-th
+    value of the first axis and the j-th of the second). `sensitivity` varies
+    one axis at a time with the others at the snapshot's own rates, ranked by
+    swing, i.e. the bars of a tornado chart.
+    """
+    snapshot = await snapshot_cache.get(ObjectId(snapshot_id))
+    if not snapshot:
+        raise HTTPException(404, "Snapshot not found")
+    
+    city_profile = await city_profile_cache.get(snapshot["city_id"])
+    if not city_profile:
+        raise HTTPException(404, "City profile not found")
+    
+    try:
+        evaluator = await load_health_evaluator(city_profile)
+        plan = SweepPlan(evaluator, snapshot["stages"], [axis.dict() for axis in request.axes])
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    
+    if plan.points > SWEEP_MAX_POINTS:
+        raise HTTPException(400, f"The grid has {plan.points} points; the limit is {SWEEP_MAX_POINTS}")
+    
+    scores = await sweep_runner.run(plan)
+    baseline_score = plan.baseline_score()
+    
+    axes = [
+        {"stage_number": axis.stage_number, "parameter_id": axis.parameter_id, "values": values.tolist()}
+        for axis, values in zip(request.axes, plan.values)
+    ]
+    
+    sensitivity = []
+    for a, axis in enumerate(axes):
+        axis_scores = plan.one_at_a_time(a)
+        low, high = int(plan.values[a].argmin()), int(plan.values[a].argmax())
+        sensitivity.append({
+            "stage_number": axis["stage_number"],
+            "parameter_id": axis["parameter_id"],
+            "baseline_growth_rate": plan.baseline_rates[a],
+            "low": {"growth_rate": axis["values"][low], "health_score": float(axis_scores[low])},
+            "high": {"growth_rate": axis["values"][high], "health_score": float(axis_scores[high])},
+            "swing": float(axis_scores.max() - axis_scores.min())
         })
+    sensitivity.sort(key=lambda item: item["swing"], reverse=True)
     
-    term_result["economic_health_score"] = calculate_economic_health(term_result["parameters"], city_profile)
+    best = int(scores.argmax())
+    worst = int(scores.argmin())
+    response = {
+        "snapshot_id": snapshot_id,
+        "points": plan.points,
+        "baseline_health_score": baseline_score,
+        "axes": axes,
+        "best": {"growth_rates": plan.rates_at(best), "health_score": float(scores[best])},
+        "worst": {"growth_rates": plan.rates_at(worst), "health_score": float(scores[worst])},
+        "sensitivity": sensitivity
+    }
+    if request.include_surface:
+        response["surface"] = scores.reshape(plan.shape).tolist()
     
-    if "results" not in snapshot:
-        snapshot["results"] = []
+    return MongoJSONResponse(response)
+
+@router.post("/{snapshot_id}/optimize", response_model=Dict[str, Any], response_class=MongoJSONResponse)
+async def optimize_snapshot(snapshot_id: str, request: OptimizeRequest):
+    """Search the free stage growth rates for the smallest total change that meets a target.
+
+    The target is the final health score, or the final value of
+    `target.parameter_id`, with `at_least` and/or `at_most`. Candidates are
+    evaluated in memory; nothing is written. When no candidate meets the
+    target, the closest one is returned with `satisfied: false`.
+    """
+    snapshot = await snapshot_cache.get(ObjectId(snapshot_id))
+    if not snapshot:
+        raise HTTPException(404, "Snapshot not found")
     
-    if current_term <= len(snapshot["results"]):
-        snapshot["results"][current_term - 1] = term_result
-    else:
-        snapshot["results"].append(term_result)
+    if request.population * request.iterations > OPTIMIZER_MAX_EVALUATIONS:
+        raise HTTPException(400, f"population x iterations is limited to {OPTIMIZER_MAX_EVALUATIONS} evaluations")
     
-    total_terms = sum(stage["terms"] for stage in snapshot["stages"])
-    is_completed = current_term >= total_terms
+    city_profile = await city_profile_cache.get(snapshot["city_id"])
+    if not city_profile:
+        raise HTTPException(404, "City profile not found")
     
-    if is_completed:
-        ai_analysis = await generate_ai_analysis(snapshot, city_profile, snapshot["results"])
-        update_fields = {
-            "results": snapshot["results"],
-            "is_completed": is_completed,
-            "ai_analysis": ai_analysis
-        }
-    else:
-        update_fields = {
-            "results": snapshot["results"],
-            "is_completed": is_completed
-        }
+    free = [item.dict() for item in request.free]
+    target = request.target
     
-    update_result = await snapshots_collection.update_one(
-        {"_id": ObjectId(snapshot_id)},
-        {"$set": update_fields}
-    )
+    started = time.perf_counter()
+    try:
+        evaluator = await load_health_evaluator(city_profile)
+        kernel = StageRateKernel(evaluator, snapshot["stages"], free)
+        target_row = None
+        if target.parameter_id:
+            target_ids = [str(param_id) for param_id in evaluator.parameter_ids]
+            if target.parameter_id not in target_ids:
+                raise ValueError(f"Parameter {target.parameter_id} is not part of the city profile")
+            target_row = target_ids.index(target.parameter_id)
+        rates, metric, violation, change, evaluations, iterations = optimize_stage_rates(
+            kernel,
+            [item["min"] for item in free],
+            [item["max"] for item in free],
+            target_row,
+            target.at_least,
+            target.at_most,
+            request.population,
+            request.iterations,
+            request.seed
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    elapsed = time.perf_counter() - started
+    
+    for item in free:
+        item["parameter_id"] = ObjectId(item["parameter_id"])
+    stages = apply_stage_rates(snapshot["stages"], free, rates.tolist())
+    results = run_simulation(evaluator, stages)
     
-    updated_snapshot = await snapshots_collection.find_one({"_id": ObjectId(snapshot_id)})
-    return serialize_mongo_doc(updated_snapshot)
\ No newline at end of file
+    return MongoJSONResponse({
+        "snapshot_id": snapshot_id,
+        "target": target.dict(),
+        "satisfied": violation == 0,
+        "final_value": metric,
+        "baseline_final_value": (
+            kernel.baseline_score() if target_row is None
+            else round(float(kernel.baseline_values()[target_row]), 2)
+        ),
+        "total_change": change,
+        "growth_rates": [
+            {
+                "stage_number": item["stage_number"],
+                "parameter_id": item["parameter_id"],
+                "growth_rate": rate,
+                "baseline_growth_rate": baseline_rate
+            }
+            for item, rate, baseline_rate in zip(free, rates.tolist(), kernel.baseline_rates)
+        ],
+        "stages": stages,
+        "results": results,
+        "evaluations": evaluations,
+        "iterations": iterations,
+        "elapsed_ms": round(elapsed * 1000, 2)
+    })
@@ -1,4 +1,6 @@
 import os
+import json
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,4 +11,85 @@ API_VERSION = "2.0"
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = "econ_simulator_db"
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key")
\ No newline at end of file
+# Motor client settings; the client is created and pinged in the app's lifespan.
+# MONGO_MAX_IDLE_TIME_MS=0 keeps idle pooled connections open indefinitely.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Wire compressors in order of preference, e.g. "zstd,zlib"; zstd and snappy need their optional packages
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+
+# "mongo", or "memory" to run without a database
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
+
+# Explain every audited route query at startup and warn about collection scans
+QUERY_AUDIT = os.getenv("QUERY_AUDIT", "false").lower() == "true"
+
+# Record route, Mongo command and engine timings for GET /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Profile single requests that send PROFILING_HEADER; off means no profiling middleware at all
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ecosim-profiles"))
+PROFILE_STORE_LIMIT = int(os.getenv("PROFILE_STORE_LIMIT", "50"))
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key")
+
+# "openai" or "stub" (canned local responses for tests and load runs)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_STUB_DELAY = float(os.getenv("LLM_STUB_DELAY", "0"))
+
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "4"))
+ANALYSIS_QUEUE_SIZE = int(os.getenv("ANALYSIS_QUEUE_SIZE", "1000"))
+
+PARAMETER_CATALOG_WATCH = os.getenv("PARAMETER_CATALOG_WATCH", "true").lower() == "true"
+PARAMETER_CATALOG_MISS_REFRESH = float(os.getenv("PARAMETER_CATALOG_MISS_REFRESH", "5"))  # seconds
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "1024"))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", "86400"))  # seconds
+
+# Read-through cache of city profiles and snapshot definitions
+READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", "1024"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "30"))
+
+LIST_DEFAULT_LIMIT = int(os.getenv("LIST_DEFAULT_LIMIT", "100"))
+LIST_MAX_LIMIT = int(os.getenv("LIST_MAX_LIMIT", "1000"))
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_BATCH_SIZE = int(os.getenv("IMPORT_MAX_BATCH_SIZE", "10000"))
+
+MONTE_CARLO_MAX_PATHS = int(os.getenv("MONTE_CARLO_MAX_PATHS", "100000"))
+MONTE_CARLO_BLOCK_ELEMENTS = int(os.getenv("MONTE_CARLO_BLOCK_ELEMENTS", "8000000"))
+
+COMPARE_MAX_SNAPSHOTS = int(os.getenv("COMPARE_MAX_SNAPSHOTS", "20"))
+
+# Parameter sweeps: grid size cap, and grids of at least SWEEP_PROCESS_THRESHOLD
+# points are split across SWEEP_WORKERS processes
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "2000000"))
+SWEEP_PROCESS_THRESHOLD = int(os.getenv("SWEEP_PROCESS_THRESHOLD", "200000"))
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", str(os.cpu_count() or 1)))
+
+# Streaming simulate: default terms per emitted block, and how long the stream
+# waits for the AI analysis before ending with an analysis_pending event
+STREAM_BLOCK_TERMS = int(os.getenv("STREAM_BLOCK_TERMS", "10"))
+STREAM_ANALYSIS_TIMEOUT = float(os.getenv("STREAM_ANALYSIS_TIMEOUT", "60"))
+
+# Goal-seeking optimizer: cap on population x iterations per request
+OPTIMIZER_MAX_EVALUATIONS = int(os.getenv("OPTIMIZER_MAX_EVALUATIONS", "200000"))
+
+# Historical analytics materialized per city profile: rolling mean window, in terms
+HISTORY_ROLLING_WINDOW = int(os.getenv("HISTORY_ROLLING_WINDOW", "3"))
+
+# Baseline trajectories (every parameter at its default growth rate): terms
+# simulated per profile version, and the in-process cache of decoded baselines
+BASELINE_HORIZON = int(os.getenv("BASELINE_HORIZON", "120"))
+BASELINE_CACHE_SIZE = int(os.getenv("BASELINE_CACHE_SIZE", "1024"))
+BASELINE_CACHE_TTL = float(os.getenv("BASELINE_CACHE_TTL", "3600"))
+
+# Health score weights and directions (+1 higher is better, -1 lower is better)
+# keyed by parameter category, e.g. '{"Monetary": 0.5}'
+HEALTH_CATEGORY_WEIGHTS = json.loads(os.getenv("HEALTH_CATEGORY_WEIGHTS", "{}"))
+HEALTH_CATEGORY_DIRECTIONS = json.loads(os.getenv("HEALTH_CATEGORY_DIRECTIONS", "{}"))
@@ -1,11 +1,52 @@
 import motor.motor_asyncio
-from app.core.config import MONGO_URL, DB_NAME
+from pymongo import monitoring
+from app.core.config import (
+    MONGO_URL, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_COMPRESSORS, METRICS_ENABLED
+)
+from app.core.metrics import mongo_command_seconds, mongo_command_failures
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records the latency of every command the driver sends, by collection and command name.
 
-countries_collection = db.countries
-cities_collection = db.cities
-economic_parameters_collection = db.economic_parameters
-city_profiles_collection = db.city_profiles
-snapshots_collection = db.snapshots
\ No newline at end of file
+    The driver calls these hooks from its own threads; the collection is
+    remembered from the started event until the matching reply arrives.
+    """
+
+    def __init__(self):
+        self.pending = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        self.pending[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else "none"
+        )
+
+    def succeeded(self, event):
+        collection = self.pending.pop((event.connection_id, event.request_id), "none")
+        mongo_command_seconds.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self.pending.pop((event.connection_id, event.request_id), "none")
+        mongo_command_seconds.labels(collection, event.command_name).observe(event.duration_micros / 1e6)
+        mongo_command_failures.labels(collection, event.command_name).inc()
+
+def create_client(url=MONGO_URL):
+    """Build the Motor client from config.
+
+    This module is only imported when the Mongo backend is created, so
+    importing the app does not load the driver or start its monitor threads.
+    """
+    options = {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS or None,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    if METRICS_ENABLED:
+        options["event_listeners"] = [MongoCommandMetrics()]
+    return motor.motor_asyncio.AsyncIOMotorClient(url, **options)
@@ -0,0 +1,82 @@
+import logging
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Indexes each collection needs, applied idempotently at startup. The
+# compound `(filter field, _id)` indexes serve both the equality filter and
+# the keyset pagination sort of the list routes.
+INDEXES = {
+    "cities": [
+        IndexModel([("country_id", ASCENDING), ("_id", ASCENDING)], name="country_id__id")
+    ],
+    "economic_parameters": [
+        IndexModel([("category", ASCENDING), ("_id", ASCENDING)], name="category__id")
+    ],
+    "city_profiles": [
+        IndexModel([("city_id", ASCENDING)], name="city_id_unique", unique=True)
+    ],
+    "snapshots": [
+        IndexModel([("city_id", ASCENDING), ("_id", ASCENDING)], name="city_id__id")
+    ],
+    "analysis_jobs": [
+        IndexModel([("snapshot_id", ASCENDING)], name="snapshot_id")
+    ],
+    "history_analytics": [
+        IndexModel([("country_id", ASCENDING), ("_id", ASCENDING)], name="country_id__id")
+    ],
+    "analysis_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0)
+    ]
+}
+
+# Representative query shapes issued by the routes, as
+# (route, collection, filter, sort). Filter values only need the right type.
+AUDITED_QUERIES = [
+    ("GET /countries/", "countries", {}, [("_id", ASCENDING)]),
+    ("GET /cities/?country_id=", "cities", {"country_id": ObjectId()}, [("_id", ASCENDING)]),
+    ("GET /parameters/?category=", "economic_parameters", {"category": "Growth"}, [("_id", ASCENDING)]),
+    ("GET /city-profiles/{city_id}", "city_profiles", {"city_id": ObjectId()}, None),
+    ("GET /snapshots/?city_id=", "snapshots", {"city_id": ObjectId()}, [("_id", ASCENDING)]),
+    ("GET /snapshots/{snapshot_id}", "snapshots", {"_id": ObjectId()}, None),
+    ("GET /analysis-jobs/{job_id}", "analysis_jobs", {"_id": ObjectId()}, None),
+    ("GET /city-profiles/history?country_id=", "history_analytics", {"country_id": ObjectId()}, [("_id", ASCENDING)])
+]
+
+async def ensure_indexes(db):
+    """Create every index in INDEXES; existing identical indexes are left as they are."""
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.warning("Could not create indexes on %s: %s", collection, e)
+
+def plan_stages(plan):
+    """Yield every stage name in an explain plan tree."""
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from plan_stages(child)
+    # Slot-based engine plans nest the classic plan under queryPlan
+    if "queryPlan" in plan:
+        yield from plan_stages(plan["queryPlan"])
+
+async def audit_queries(db, queries=AUDITED_QUERIES):
+    """Explain each audited query and report the ones whose winning plan is a COLLSCAN."""
+    findings = []
+    for route, collection, filter_query, sort in queries:
+        command = {"find": collection, "filter": filter_query}
+        if sort:
+            command["sort"] = dict(sort)
+        explain = await db.command("explain", command, verbosity="queryPlanner")
+        stages = set(plan_stages(explain["queryPlanner"]["winningPlan"]))
+        findings.append({
+            "route": route,
+            "collection": collection,
+            "stages": sorted(stage for stage in stages if stage),
+            "collscan": "COLLSCAN" in stages
+        })
+    return findings
@@ -0,0 +1,77 @@
+import time
+from app.utils.metrics import Counter, Gauge, Histogram
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.",
+    ("method", "route", "status")
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "Requests currently being handled.", ("method",)
+)
+mongo_command_seconds = Histogram(
+    "mongo_command_duration_seconds", "Round trip time of MongoDB commands as reported by the driver.",
+    ("collection", "command")
+)
+mongo_command_failures = Counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error.", ("collection", "command")
+)
+simulation_seconds = Histogram(
+    "simulation_duration_seconds", "Time spent in the simulation engine.", ("operation",)
+)
+health_score_seconds = Histogram(
+    "health_score_duration_seconds", "Time spent scoring simulated values."
+)
+serialization_seconds = Histogram(
+    "serialization_duration_seconds", "Time spent turning Mongo documents into response data.", ("function",)
+)
+ai_analysis_seconds = Histogram(
+    "ai_analysis_duration_seconds", "Time spent generating AI analyses, by whether the LLM answered.",
+    ("outcome",), buckets=(0.01, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+llm_request_seconds = Histogram(
+    "llm_request_duration_seconds", "Time spent waiting for the LLM, excluding analyses served from cache.",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+
+startup_seconds = Histogram(
+    "startup_duration_seconds", "Time the app's lifespan took to become ready to serve.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by method, route template and status.
+
+    Routes are labelled with their path template (`/snapshots/{snapshot_id}`)
+    rather than the raw path, so label cardinality stays bounded; requests
+    that match no route are labelled `unmatched`. Streaming responses are
+    timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            http_request_seconds.labels(
+                method, route.path if route is not None else "unmatched", status
+            ).observe(time.perf_counter() - start)
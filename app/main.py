@@ -1,9 +1,54 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.routes import router
-from app.core.config import API_TITLE
+from app.core.config import API_TITLE, PARAMETER_CATALOG_WATCH, QUERY_AUDIT, METRICS_ENABLED, PROFILING_ENABLED
+from app.core.metrics import MetricsMiddleware, startup_seconds
+from app.repositories import storage
+from app.services import ai_analysis
+from app.services.analysis_jobs import analysis_jobs
+from app.services.parameter_catalog import parameter_catalog
+from app.services.profiling import ProfilingMiddleware
+from app.services.sweep import sweep_runner
 
-app = FastAPI(title=API_TITLE)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start = time.perf_counter()
+    # Importing the LLM SDK is the slowest part of a cold start and no request
+    # needs it right away, so the client is built in a thread while we serve
+    llm_warmup = None
+    if ai_analysis.llm_client is None:
+        llm_warmup = asyncio.create_task(ai_analysis.warm_llm_client())
+    ready = False
+    try:
+        await storage.initialize(audit=QUERY_AUDIT)
+        await analysis_jobs.start()
+        if PARAMETER_CATALOG_WATCH:
+            await parameter_catalog.start_watch()
+        elapsed = time.perf_counter() - start
+        startup_seconds.observe(elapsed)
+        logger.info("Startup finished in %.0f ms", elapsed * 1000)
+        ready = True
+        yield
+    finally:
+        # Also runs when startup fails (e.g. Mongo is unreachable), so workers,
+        # the sweep pool and both clients are never left open
+        if llm_warmup is not None:
+            if not ready:
+                llm_warmup.cancel()
+            await asyncio.gather(llm_warmup, return_exceptions=True)
+        await parameter_catalog.stop_watch()
+        await analysis_jobs.stop()
+        sweep_runner.stop()
+        await ai_analysis.close_llm_client()
+        storage.close()
+
+app = FastAPI(title=API_TITLE, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,8 +56,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Profile-Id"],
 )
 
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 @app.get("/")
 async def root():
     return {"message": "Economic Simulation API v2.0"}
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
+from app.core.config import MONTE_CARLO_MAX_PATHS, COMPARE_MAX_SNAPSHOTS
 
 class CountryCreate(BaseModel):
     name: str
@@ -21,11 +22,17 @@ class EconomicParameterCreate(BaseModel):
     description: Optional[str] = None
     category: str
 
+class HistoricalValue(BaseModel):
+    term: int
+    value: float
+    growth_rate: Optional[float] = None
+    date: Optional[str] = None
+
 class ParameterValue(BaseModel):
     parameter_id: str
     base_value: float
     default_growth_rate: float
-    historical_values: Optional[List[Dict[str, Any]]] = []
+    historical_values: Optional[List[HistoricalValue]] = []
 
 class CityProfileCreate(BaseModel):
     city_id: str
@@ -33,6 +40,11 @@ class CityProfileCreate(BaseModel):
     economic_health_score: Optional[float] = 50.0
     summary: Optional[str] = None
 
+class CityProfileUpdate(BaseModel):
+    parameters: List[ParameterValue]
+    economic_health_score: Optional[float] = 50.0
+    summary: Optional[str] = None
+
 class SimulationStage(BaseModel):
     stage_number: int
     terms: int
@@ -43,5 +55,65 @@ class SnapshotCreate(BaseModel):
     city_id: str
     stages: List[SimulationStage]
 
+class SnapshotUpdate(BaseModel):
+    name: Optional[str] = None
+    stages: Optional[List[SimulationStage]] = None  # replacing the stages discards the results
+
 class SimulationAdvance(BaseModel):
-    current_term: int
\ No newline at end of file
+    current_term: int
+
+class GrowthDistribution(BaseModel):
+    stage_number: int
+    parameter_id: str
+    distribution: Literal["normal", "uniform"] = "normal"
+    mean: Optional[float] = None  # defaults to the stage's fixed growth_rate
+    spread: float = Field(ge=0)  # standard deviation, or half-width for uniform
+
+class MonteCarloRequest(BaseModel):
+    paths: int = Field(10000, ge=1, le=MONTE_CARLO_MAX_PATHS)
+    seed: Optional[int] = None
+    distributions: List[GrowthDistribution] = []
+    percentiles: List[float] = Field([5, 50, 95], min_length=1)
+
+class SnapshotCompareRequest(BaseModel):
+    snapshot_ids: List[str] = Field(min_length=2, max_length=COMPARE_MAX_SNAPSHOTS)  # the first is the reference
+    parameter_ids: List[str] = []  # only these parameters; default every parameter
+    fields: List[Literal["values", "deltas", "health"]] = ["values", "deltas", "health"]
+    divergence_threshold: float = Field(0.01, ge=0)  # health score points
+
+class SweepAxis(BaseModel):
+    stage_number: int
+    parameter_id: str
+    values: List[float] = []  # explicit growth rates to try...
+    start: Optional[float] = None  # ...or `steps` evenly spaced rates from start to stop
+    stop: Optional[float] = None
+    steps: int = Field(5, ge=1)
+
+class SweepRequest(BaseModel):
+    axes: List[SweepAxis] = Field(min_length=1)
+    include_surface: bool = True  # return the score of every grid point
+
+class OptimizationTarget(BaseModel):
+    parameter_id: Optional[str] = None  # final value of this parameter; the health score when omitted
+    at_least: Optional[float] = None
+    at_most: Optional[float] = None
+
+class FreeGrowthRate(BaseModel):
+    stage_number: int
+    parameter_id: str
+    min: float
+    max: float
+
+class OptimizeRequest(BaseModel):
+    target: OptimizationTarget
+    free: List[FreeGrowthRate] = Field(min_length=1)
+    population: int = Field(256, ge=8, le=4096)  # candidates evaluated per iteration
+    iterations: int = Field(40, ge=1, le=1000)
+    seed: Optional[int] = None
+
+class PolicySimulationRequest(BaseModel):
+    stages: List[SimulationStage]
+    country_id: Optional[str] = None  # every city of this country...
+    city_ids: List[str] = []  # ...or exactly these cities
+    persist: bool = False  # store a completed snapshot per city
+    name: Optional[str] = None  # name of the persisted snapshots
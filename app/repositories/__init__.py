@@ -0,0 +1,40 @@
+from app.core.config import STORAGE_BACKEND, DB_NAME
+from app.repositories.base import BulkInsertError, DuplicateDocumentError, ChangeStreamUnavailable
+
+def create_backend(name=STORAGE_BACKEND):
+    if name == "mongo":
+        from app.core.database import create_client
+        from app.repositories.mongo import MongoStorage
+        return MongoStorage(create_client()[DB_NAME])
+    if name == "memory":
+        from app.repositories.memory import MemoryStorage
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend: {name}")
+
+class Storage:
+    """The active storage backend's repositories, created on first use.
+
+    Routes and services reach the database only through `storage.countries`,
+    `storage.snapshots` and so on. `use()` swaps in another backend, e.g. a
+    MemoryStorage for tests and benchmarks.
+    """
+
+    def __init__(self):
+        self._backend = None
+
+    def use(self, backend):
+        self._backend = backend
+        return backend
+
+    def close(self):
+        if self._backend is not None:
+            self._backend.close()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        if self._backend is None:
+            self._backend = create_backend()
+        return getattr(self._backend, name)
+
+storage = Storage()
@@ -0,0 +1,111 @@
+from abc import ABC, abstractmethod
+
+class BulkInsertError(Exception):
+    """Some documents of an unordered bulk insert were rejected; the rest were stored."""
+
+    def __init__(self, inserted, errors):
+        super().__init__(f"{len(errors)} documents failed to insert")
+        self.inserted = inserted
+        self.errors = errors  # [{"index": position in the batch, "error": message}]
+
+class DuplicateDocumentError(Exception):
+    """A write would store a second document with the same `_id` or uniquely indexed field."""
+
+class ChangeStreamUnavailable(Exception):
+    """The deployment cannot open a change stream, e.g. a standalone Mongo server."""
+
+class DocumentRepository(ABC):
+    """Storage for one kind of document, addressed by its ObjectId `_id`.
+
+    Filters are equality matches on top-level fields and projections are
+    inclusion (`{"a": 1}`, or `{"a.b": 1}` into embedded documents and arrays
+    of them) or top-level exclusion (`{"a": 0}`) maps, which is all the
+    routes need and what every backend can serve.
+    """
+
+    @abstractmethod
+    async def insert(self, document):
+        """Store a document, set its `_id` and return it; raises DuplicateDocumentError on a unique key clash."""
+
+    @abstractmethod
+    async def insert_many(self, documents):
+        """Store documents unordered, setting each `_id`; raises BulkInsertError on rejects."""
+
+    @abstractmethod
+    async def get(self, document_id, projection=None):
+        """Return the document with this `_id`, or None."""
+
+    @abstractmethod
+    async def find_one(self, filter_query, projection=None):
+        """Return the first document matching an equality filter, or None."""
+
+    @abstractmethod
+    def find(self, filter_query=None, after=None, limit=None, projection=None):
+        """Async-iterate matching documents in `_id` order, starting after the `after` id."""
+
+    async def find_page(self, filter_query=None, after=None, limit=None, projection=None):
+        return [doc async for doc in self.find(filter_query, after, limit, projection)]
+
+    @abstractmethod
+    async def find_in(self, field, values, projection=None):
+        """Return every document whose `field` is one of `values`."""
+
+    @abstractmethod
+    async def update(self, document_id, fields, match=None):
+        """Set top-level fields on a document; `match` adds equality conditions. Returns whether it matched.
+
+        Raises DuplicateDocumentError if the new fields clash with a unique index.
+        """
+
+    @abstractmethod
+    async def replace_many(self, documents):
+        """Insert each document, replacing any stored document with the same `_id`."""
+
+    @abstractmethod
+    async def delete_all(self):
+        """Remove every document."""
+
+class ParameterRepository(DocumentRepository):
+    supports_change_streams = False
+
+    def watch_changes(self):
+        """Async-iterate change notifications; only backends with `supports_change_streams` implement it.
+
+        Raises ChangeStreamUnavailable when the deployment has no change
+        streams; any other error is a real failure and propagates.
+        """
+        raise ChangeStreamUnavailable("This storage backend has no change stream")
+
+class CityProfileRepository(DocumentRepository):
+    async def get_by_city(self, city_id, projection=None):
+        return await self.find_one({"city_id": city_id}, projection)
+
+class SnapshotRepository(DocumentRepository):
+    @abstractmethod
+    async def count_results(self, snapshot_id):
+        """Length of a snapshot's results array, without loading it."""
+
+    @abstractmethod
+    async def get_result(self, snapshot_id, index):
+        """One entry of a snapshot's results array, without loading the rest."""
+
+    @abstractmethod
+    async def write_result(self, snapshot_id, term_result, fields, index=None):
+        """Replace results[index], or append when `index` is None, and set `fields`.
+
+        An append also increments `results_count` in the same atomic write, so
+        concurrent appends keep it equal to the length of `results`.
+        """
+
+    @abstractmethod
+    async def append_results(self, snapshot_id, term_results, fields):
+        """Append several term results in one write and set `fields`."""
+
+class AnalysisCacheRepository(ABC):
+    @abstractmethod
+    async def get_fresh(self, key, now):
+        """Return the cached analysis for `key` unless it expired before `now`."""
+
+    @abstractmethod
+    async def put(self, key, analysis, created_at, expires_at):
+        """Insert or replace the cached analysis for `key`."""
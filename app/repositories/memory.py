@@ -0,0 +1,229 @@
+import copy
+from bisect import bisect_right, insort
+from bson import ObjectId
+from app.repositories.base import (
+    BulkInsertError, DuplicateDocumentError, DocumentRepository, ParameterRepository, CityProfileRepository,
+    SnapshotRepository, AnalysisCacheRepository
+)
+
+def _include(value, paths):
+    """Keep only the dotted `paths` (split into parts) of an embedded document or array of them."""
+    if isinstance(value, list):
+        return [_include(item, paths) for item in value if isinstance(item, dict)]
+    if not isinstance(value, dict):
+        return value
+    fields = {}
+    for path in paths:
+        fields.setdefault(path[0], []).append(path[1:])
+    return {
+        key: item if any(not rest for rest in fields[key]) else _include(item, fields[key])
+        for key, item in value.items() if key in fields
+    }
+
+def project(document, projection):
+    """Apply an inclusion (optionally dotted, as Mongo allows) or top-level exclusion projection."""
+    if not projection:
+        return dict(document)
+    if any(projection.values()):
+        paths = [key.split(".") for key, value in projection.items() if value]
+        if all(len(path) == 1 for path in paths):
+            return {key: value for key, value in document.items() if key == "_id" or projection.get(key)}
+        return {"_id": document["_id"], **_include(document, paths)}
+    return {key: value for key, value in document.items() if projection.get(key, 1)}
+
+class MemoryRepository(DocumentRepository):
+    """Dict-backed repository with sorted secondary indexes on chosen fields.
+
+    Documents are deep-copied on the way in. Reads return new top-level dicts
+    that share nested values with the store, so callers must not mutate them
+    in place; every route already writes through the repository instead.
+    """
+
+    def __init__(self, indexed_fields=(), unique_fields=()):
+        self.documents = {}
+        self.order = []
+        self.indexed_fields = tuple(indexed_fields) + tuple(unique_fields)
+        self.unique_fields = tuple(unique_fields)
+        self.indexes = {field: {} for field in self.indexed_fields}
+
+    def _check_unique(self, document, exclude=None):
+        for field in self.unique_fields:
+            if any(doc_id != exclude for doc_id in self.indexes[field].get(document.get(field), [])):
+                raise DuplicateDocumentError(f"E11000 duplicate key error: {field} {document.get(field)}")
+
+    def _store(self, document):
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self.documents:
+            raise DuplicateDocumentError(f"E11000 duplicate key error: _id {document['_id']}")
+        self._check_unique(document)
+        stored = copy.deepcopy(document)
+        self.documents[stored["_id"]] = stored
+        self._index(stored)
+        return document
+
+    def _index(self, document):
+        doc_id = document["_id"]
+        if not self.order or self.order[-1] < doc_id:
+            self.order.append(doc_id)
+        else:
+            insort(self.order, doc_id)
+        self._index_fields(document)
+
+    def _index_fields(self, document):
+        doc_id = document["_id"]
+        for field in self.indexed_fields:
+            ids = self.indexes[field].setdefault(document.get(field), [])
+            if not ids or ids[-1] < doc_id:
+                ids.append(doc_id)
+            else:
+                insort(ids, doc_id)
+
+    def _unindex(self, document):
+        for field in self.indexed_fields:
+            ids = self.indexes[field].get(document.get(field), [])
+            if document["_id"] in ids:
+                ids.remove(document["_id"])
+
+    async def insert(self, document):
+        return self._store(document)
+
+    async def insert_many(self, documents):
+        errors = []
+        for i, document in enumerate(documents):
+            try:
+                self._store(document)
+            except DuplicateDocumentError as e:
+                errors.append({"index": i, "error": str(e)})
+        if errors:
+            raise BulkInsertError(len(documents) - len(errors), errors)
+        return documents
+
+    async def get(self, document_id, projection=None):
+        document = self.documents.get(document_id)
+        return project(document, projection) if document is not None else None
+
+    def _candidates(self, filter_query, after):
+        filter_query = filter_query or {}
+        indexed = [field for field in filter_query if field in self.indexes]
+        ids = self.indexes[indexed[0]].get(filter_query[indexed[0]], []) if indexed else self.order
+        start = bisect_right(ids, after) if after is not None else 0
+        for doc_id in ids[start:]:
+            document = self.documents[doc_id]
+            if all(document.get(field) == value for field, value in filter_query.items()):
+                yield document
+
+    async def find_one(self, filter_query, projection=None):
+        for document in self._candidates(filter_query, None):
+            return project(document, projection)
+        return None
+
+    async def find(self, filter_query=None, after=None, limit=None, projection=None):
+        for count, document in enumerate(self._candidates(filter_query, after)):
+            if limit and count >= limit:
+                return
+            yield project(document, projection)
+
+    async def find_in(self, field, values, projection=None):
+        if field == "_id":
+            found = (self.documents.get(value) for value in values)
+        elif field in self.indexes:
+            found = (self.documents[doc_id] for value in values for doc_id in self.indexes[field].get(value, []))
+        else:
+            wanted = set(values)
+            found = (document for document in self.documents.values() if document.get(field) in wanted)
+        return [project(document, projection) for document in found if document is not None]
+
+    async def update(self, document_id, fields, match=None):
+        document = self.documents.get(document_id)
+        if document is None or any(document.get(key) != value for key, value in (match or {}).items()):
+            return False
+        self._check_unique({**document, **fields}, exclude=document_id)
+        self._unindex(document)
+        document.update(copy.deepcopy(fields))
+        self._index_fields(document)
+        return True
+
+    async def replace_many(self, documents):
+        for document in documents:
+            stored = self.documents.pop(document["_id"], None)
+            if stored is not None:
+                self._unindex(stored)
+                self.order.remove(stored["_id"])
+            self._store(document)
+
+    async def delete_all(self):
+        self.documents.clear()
+        self.order.clear()
+        self.indexes = {field: {} for field in self.indexed_fields}
+
+class MemoryParameterRepository(MemoryRepository, ParameterRepository):
+    pass
+
+class MemoryCityProfileRepository(MemoryRepository, CityProfileRepository):
+    pass
+
+class MemorySnapshotRepository(MemoryRepository, SnapshotRepository):
+    async def count_results(self, snapshot_id):
+        document = self.documents.get(snapshot_id)
+        return len(document.get("results") or []) if document else 0
+
+    async def get_result(self, snapshot_id, index):
+        results = (self.documents.get(snapshot_id) or {}).get("results") or []
+        return results[index] if -len(results) <= index < len(results) else None
+
+    async def write_result(self, snapshot_id, term_result, fields, index=None):
+        document = self.documents.get(snapshot_id)
+        if document is None:
+            return
+        results = document.setdefault("results", [])
+        if index is None:
+            results.append(copy.deepcopy(term_result))
+            fields = {**fields, "results_count": document.get("results_count", 0) + 1}
+        else:
+            # Like Mongo's positional $set, writing past the end pads with nulls
+            results.extend([None] * (index + 1 - len(results)))
+            results[index] = copy.deepcopy(term_result)
+        await self.update(snapshot_id, fields)
+
+    async def append_results(self, snapshot_id, term_results, fields):
+        document = self.documents.get(snapshot_id)
+        if document is None:
+            return
+        document.setdefault("results", []).extend(copy.deepcopy(term_results))
+        await self.update(snapshot_id, fields)
+
+class MemoryAnalysisCacheRepository(AnalysisCacheRepository):
+    def __init__(self):
+        self.entries = {}
+
+    async def get_fresh(self, key, now):
+        entry = self.entries.get(key)
+        return entry["analysis"] if entry and entry["expires_at"] > now else None
+
+    async def put(self, key, analysis, created_at, expires_at):
+        self.entries[key] = {"analysis": copy.deepcopy(analysis), "created_at": created_at, "expires_at": expires_at}
+
+class MemoryStorage:
+    """Repositories held in process memory, for tests, profiling and load runs without MongoDB.
+
+    The secondary indexes mirror the Mongo indexes in app/core/indexes.py.
+    """
+
+    backend = "memory"
+
+    def __init__(self):
+        self.countries = MemoryRepository()
+        self.cities = MemoryRepository(indexed_fields=["country_id"])
+        self.parameters = MemoryParameterRepository(indexed_fields=["category"])
+        self.city_profiles = MemoryCityProfileRepository(unique_fields=["city_id"])
+        self.snapshots = MemorySnapshotRepository(indexed_fields=["city_id"])
+        self.analysis_jobs = MemoryRepository(indexed_fields=["snapshot_id"])
+        self.analysis_cache = MemoryAnalysisCacheRepository()
+        self.history_analytics = MemoryRepository(indexed_fields=["country_id"])
+        self.baselines = MemoryRepository()
+
+    async def initialize(self, audit=False):
+        pass
+
+    def close(self):
+        pass
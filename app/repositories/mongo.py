@@ -0,0 +1,174 @@
+import logging
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from app.core.indexes import ensure_indexes, audit_queries
+from app.repositories.base import (
+    BulkInsertError, DuplicateDocumentError, ChangeStreamUnavailable, DocumentRepository, ParameterRepository,
+    CityProfileRepository, SnapshotRepository, AnalysisCacheRepository
+)
+
+logger = logging.getLogger(__name__)
+
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+class MongoRepository(DocumentRepository):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def insert(self, document):
+        try:
+            result = await self.collection.insert_one(document)
+        except DuplicateKeyError as e:
+            raise DuplicateDocumentError(str(e)) from e
+        document["_id"] = result.inserted_id
+        return document
+
+    async def insert_many(self, documents):
+        if not documents:
+            return documents
+        try:
+            result = await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            raise BulkInsertError(
+                e.details["nInserted"],
+                [{"index": error["index"], "error": error["errmsg"]} for error in e.details["writeErrors"]]
+            )
+        for document, inserted_id in zip(documents, result.inserted_ids):
+            document["_id"] = inserted_id
+        return documents
+
+    async def get(self, document_id, projection=None):
+        return await self.collection.find_one({"_id": document_id}, projection)
+
+    async def find_one(self, filter_query, projection=None):
+        return await self.collection.find_one(filter_query, projection)
+
+    def _cursor(self, filter_query, after, limit, projection):
+        query = dict(filter_query or {})
+        if after is not None:
+            query["_id"] = {"$gt": after}
+        cursor = self.collection.find(query, projection).sort("_id", 1)
+        return cursor.limit(limit) if limit else cursor
+
+    async def find(self, filter_query=None, after=None, limit=None, projection=None):
+        async for document in self._cursor(filter_query, after, limit, projection):
+            yield document
+
+    async def find_page(self, filter_query=None, after=None, limit=None, projection=None):
+        return await self._cursor(filter_query, after, limit, projection).to_list(None)
+
+    async def find_in(self, field, values, projection=None):
+        return await self.collection.find({field: {"$in": list(values)}}, projection).to_list(None)
+
+    async def update(self, document_id, fields, match=None):
+        try:
+            result = await self.collection.update_one({**(match or {}), "_id": document_id}, {"$set": fields})
+        except DuplicateKeyError as e:
+            raise DuplicateDocumentError(str(e)) from e
+        return result.matched_count > 0
+
+    async def replace_many(self, documents):
+        if documents:
+            await self.collection.bulk_write(
+                [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents],
+                ordered=False
+            )
+
+    async def delete_all(self):
+        await self.collection.delete_many({})
+
+class MongoParameterRepository(MongoRepository, ParameterRepository):
+    supports_change_streams = True
+
+    async def watch_changes(self):
+        try:
+            async with self.collection.watch() as stream:
+                async for change in stream:
+                    yield change
+        except OperationFailure as e:
+            if e.code != CHANGE_STREAM_UNSUPPORTED:
+                raise
+            raise ChangeStreamUnavailable(str(e)) from e
+
+class MongoCityProfileRepository(MongoRepository, CityProfileRepository):
+    pass
+
+class MongoSnapshotRepository(MongoRepository, SnapshotRepository):
+    async def count_results(self, snapshot_id):
+        pipeline = [
+            {"$match": {"_id": snapshot_id}},
+            {"$project": {"count": {"$size": {"$ifNull": ["$results", []]}}}}
+        ]
+        counts = await self.collection.aggregate(pipeline).to_list(1)
+        return counts[0]["count"] if counts else 0
+
+    async def get_result(self, snapshot_id, index):
+        pipeline = [
+            {"$match": {"_id": snapshot_id}},
+            {"$project": {"_id": 0, "result": {"$arrayElemAt": ["$results", index]}}}
+        ]
+        found = await self.collection.aggregate(pipeline).to_list(1)
+        return found[0].get("result") if found else None
+
+    async def write_result(self, snapshot_id, term_result, fields, index=None):
+        update = {"$set": dict(fields)}
+        if index is None:
+            update["$push"] = {"results": term_result}
+            update["$inc"] = {"results_count": 1}
+        else:
+            update["$set"][f"results.{index}"] = term_result
+        await self.collection.update_one({"_id": snapshot_id}, update)
+
+    async def append_results(self, snapshot_id, term_results, fields):
+        await self.collection.update_one(
+            {"_id": snapshot_id},
+            {"$push": {"results": {"$each": term_results}}, "$set": fields}
+        )
+
+class MongoAnalysisCacheRepository(AnalysisCacheRepository):
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def get_fresh(self, key, now):
+        stored = await self.collection.find_one({"_id": key, "expires_at": {"$gt": now}})
+        return stored["analysis"] if stored else None
+
+    async def put(self, key, analysis, created_at, expires_at):
+        await self.collection.replace_one(
+            {"_id": key},
+            {"analysis": analysis, "created_at": created_at, "expires_at": expires_at},
+            upsert=True
+        )
+
+class MongoStorage:
+    """Repositories backed by Motor collections of one database."""
+
+    backend = "mongo"
+
+    def __init__(self, db):
+        self.db = db
+        self.countries = MongoRepository(db.countries)
+        self.cities = MongoRepository(db.cities)
+        self.parameters = MongoParameterRepository(db.economic_parameters)
+        self.city_profiles = MongoCityProfileRepository(db.city_profiles)
+        self.snapshots = MongoSnapshotRepository(db.snapshots)
+        self.analysis_jobs = MongoRepository(db.analysis_jobs)
+        self.analysis_cache = MongoAnalysisCacheRepository(db.analysis_cache)
+        self.history_analytics = MongoRepository(db.history_analytics)
+        self.baselines = MongoRepository(db.baselines)
+
+    async def initialize(self, audit=False):
+        # Opens the first pooled connection before any request needs it, and
+        # fails startup within the server selection timeout if Mongo is down
+        await self.db.client.admin.command("ping")
+        await ensure_indexes(self.db)
+        if audit:
+            for finding in await audit_queries(self.db):
+                if finding["collscan"]:
+                    logger.warning(
+                        "Query audit: %s scans the whole %s collection", finding["route"], finding["collection"]
+                    )
+
+    def close(self):
+        self.db.client.close()
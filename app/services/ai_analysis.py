@@ -1,52 +1,121 @@
+import asyncio
 import json
-import openai
+import logging
 from bson import ObjectId
-from app.core.config import OPENAI_API_KEY
-from app.core.database import economic_parameters_collection
+from app.core.config import LLM_MODEL
+from app.core.metrics import llm_request_seconds
+from app.services.llm import create_llm_client
+from app.services.analysis_cache import analysis_cache, analysis_cache_key
+from app.services.baseline import baseline_store
+from app.services.parameter_catalog import parameter_catalog
+from app.services.simulation import load_health_evaluator
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+logger = logging.getLogger(__name__)
 
-async def generate_ai_analysis(snapshot, city_profile, results):
+# Created by the app's lifespan, or on first use outside it, so that importing
+# this module does not import the LLM SDK
+llm_client = None
+
+def get_llm_client():
+    global llm_client
+    if llm_client is None:
+        llm_client = create_llm_client()
+    return llm_client
+
+def set_llm_client(client):
+    """Swap the LLM backend, e.g. for a StubLLMClient in tests and load runs."""
+    global llm_client
+    llm_client = client
+
+async def warm_llm_client():
+    """Create the LLM client in a thread, so importing its SDK does not block the event loop."""
     try:
-        parameter_details = {}
-        for param in city_profile["parameters"]:
-            param_id = str(param["parameter_id"])
-            parameter = await economic_parameters_collection.find_one({"_id": param["parameter_id"]})
-            if parameter:
-                parameter_details[param_id] = {
-                    "name": parameter["name"],
-                    "unit": parameter["unit"],
-                    "category": parameter["category"],
-                    "base_value": param["base_value"]
-                }
-        
-        first_term = results[0] if results else None
-        last_term = results[-1] if results else None
-        
-        if not first_term or not last_term:
-            return {
-                "summary": "Insufficient data for analysis",
-                "impacts": [],
-                "recommendations": "Complete the simulation to get recommendations",
-                "comparison_to_default": "No simulation data available"
+        client = await asyncio.to_thread(create_llm_client)
+    except Exception:
+        logger.exception("Error creating LLM client")
+        return
+    if llm_client is None:
+        set_llm_client(client)
+
+async def close_llm_client():
+    global llm_client
+    if llm_client is not None:
+        await llm_client.close()
+        llm_client = None
+
+def fallback_analysis():
+    return {
+        "summary": "Analysis temporarily unavailable",
+        "impacts": [],
+        "recommendations": "Please try again later",
+        "comparison_to_default": "Error generating analysis"
+    }
+
+async def run_ai_analysis(snapshot, city_profile, results):
+    """Ask the LLM for an analysis of simulation results; errors propagate to the caller."""
+    catalog = await parameter_catalog.lookup(param["parameter_id"] for param in city_profile["parameters"])
+    parameter_details = {}
+    for param in city_profile["parameters"]:
+        param_id = str(param["parameter_id"])
+        parameter = catalog.get(param_id)
+        if parameter:
+            parameter_details[param_id] = {
+                "name": parameter["name"],
+                "unit": parameter["unit"],
+                "category": parameter["category"],
+                "base_value": param["base_value"]
             }
-        
-        parameter_changes = []
-        for param in last_term["parameters"]:
-            param_id = str(param["parameter_id"])
-            if param_id in parameter_details:
-                param_detail = parameter_details[param_id]
-                base_value = param_detail["base_value"]
-                final_value = param["value"]
-                
-                parameter_changes.append({
-                    "name": param_detail["name"],
-                    "base_value": f"{base_value} {param_detail['unit']}",
-                    "final_value": f"{final_value} {param_detail['unit']}",
-                    "percent_change": f"{((final_value / base_value) - 1) * 100:.2f}%"
-                })
-        
-        prompt = f"""
+    
+    first_term = results[0] if results else None
+    last_term = results[-1] if results else None
+    
+    if not first_term or not last_term:
+        return {
+            "summary": "Insufficient data for analysis",
+            "impacts": [],
+            "recommendations": "Complete the simulation to get recommendations",
+            "comparison_to_default": "No simulation data available"
+        }
+    
+    parameter_changes = []
+    for param in last_term["parameters"]:
+        param_id = str(param["parameter_id"])
+        if param_id in parameter_details:
+            param_detail = parameter_details[param_id]
+            base_value = param_detail["base_value"]
+            final_value = param["value"]
+            
+            parameter_changes.append({
+                "name": param_detail["name"],
+                "base_value": f"{base_value} {param_detail['unit']}",
+                "final_value": f"{final_value} {param_detail['unit']}",
+                "percent_change": f"{((final_value / base_value) - 1) * 100:.2f}%"
+            })
+    
+    # The default trajectory the analysis is compared against: every parameter
+    # at its default growth rate for as many terms as the simulation ran
+    evaluator = await load_health_evaluator(city_profile)
+    baseline = await baseline_store.get(evaluator, city_profile, last_term["term"])
+    default_values = {
+        str(param_id): round(value, 2)
+        for param_id, value in zip(baseline["parameter_ids"], baseline["values"][:, last_term["term"] - 1].tolist())
+    }
+    default_final_score = float(baseline["health_scores"][last_term["term"] - 1])
+    
+    default_changes = []
+    for param in last_term["parameters"]:
+        param_id = str(param["parameter_id"])
+        if param_id in parameter_details and param_id in default_values:
+            param_detail = parameter_details[param_id]
+            default_value = default_values[param_id]
+            
+            default_changes.append({
+                "name": param_detail["name"],
+                "default_final_value": f"{default_value} {param_detail['unit']}",
+                "simulated_minus_default": f"{param['value'] - default_value:.2f} {param_detail['unit']}"
+            })
+    
+    prompt = f"""
 You are an expert economic analyst. Analyze the following economic simulation results and provide insights:
 
 City: {snapshot['name']}
@@ -58,6 +127,11 @@ Parameter Changes (Base → Final):
 Initial Economic Health Score: {first_term['economic_health_score']:.2f}
 Final Economic Health Score: {last_term['economic_health_score']:.2f}
 
+Default Trajectory (every parameter at its default growth rate for the same terms):
+{json.dumps(default_changes, indent=2)}
+
+Final Economic Health Score on the default trajectory: {default_final_score:.2f}
+
 Please provide:
 1. A summary of the overall economic impact (2-3 paragraphs)
 2. Specific impacts for each parameter (one sentence per parameter)
@@ -77,28 +151,40 @@ Format your response as JSON with the following structure:
   "comparison_to_default": "how this differs from default trajectory"
 }}
 """
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert economic analyst providing JSON-formatted insights."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
+    
+    # The snapshot name only labels the prompt and is left out of the key, so
+    # identical stage plans for the same city share one cached analysis.
+    cache_inputs = {
+        "client": type(get_llm_client()).__name__,
+        "model": LLM_MODEL,
+        "city_id": str(snapshot["city_id"]),
+        "terms": len(results),
+        "parameter_changes": parameter_changes,
+        "initial_score": f"{first_term['economic_health_score']:.2f}",
+        "final_score": f"{last_term['economic_health_score']:.2f}",
+        "default_changes": default_changes,
+        "default_final_score": f"{default_final_score:.2f}"
+    }
+    
+    async def request_analysis():
+        with llm_request_seconds.time():
+            content = await get_llm_client().complete_json(
+                "You are an expert economic analyst providing JSON-formatted insights.",
+                prompt
+            )
         
-        analysis = json.loads(response.choices[0].message.content)
+        analysis = json.loads(content)
         
         impacts_with_ids = []
         for impact in analysis.get("impacts", []):
             param_name = impact.get("parameter", "")
             param_id = None
-            
+        
             for pid, details in parameter_details.items():
                 if details["name"].lower() == param_name.lower():
                     param_id = pid
                     break
-            
+        
             if param_id:
                 impacts_with_ids.append({
                     "parameter_id": ObjectId(param_id),
@@ -113,11 +199,4 @@ Format your response as JSON with the following structure:
         analysis["impacts"] = impacts_with_ids
         return analysis
     
-    except Exception as e:
-        print(f"Error generating AI analysis: {str(e)}")
-        return {
-            "summary": "Analysis temporarily unavailable",
-            "impacts": [],
-            "recommendations": "Please try again later",
-            "comparison_to_default": "Error generating analysis"
-        }
\ No newline at end of file
+    return await analysis_cache.get_or_compute(analysis_cache_key(cache_inputs), request_analysis)
@@ -0,0 +1,92 @@
+import asyncio
+import copy
+import hashlib
+import json
+from datetime import datetime, timedelta
+from app.core.config import ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL
+from app.repositories import storage
+from app.utils.cache import TTLCache
+
+def analysis_cache_key(inputs):
+    """SHA-256 of the canonical JSON encoding of an analysis's prompt inputs."""
+    encoded = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+class AnalysisCache:
+    """Two-tier cache of AI analyses with coalescing of identical in-flight requests.
+
+    Lookups go to the in-memory LRU first, then to the `analysis_cache`
+    repository. On a miss the first caller computes the analysis while any
+    concurrent caller with the same key awaits that same call.
+    """
+
+    def __init__(self, maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL):
+        self.ttl = ttl
+        self.memory = TTLCache(maxsize, ttl)
+        self.in_flight = {}
+        self.persistent_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_compute(self, key, compute):
+        analysis = self.memory.get(key)
+        if analysis is not None:
+            return copy.deepcopy(analysis)
+
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                # Only the caller that was computing it was cancelled, not this
+                # one, so compute it here instead
+                if not pending.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.get_or_compute(key, compute)
+
+        pending = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = pending
+        try:
+            analysis = await self._load_or_compute(key, compute)
+            pending.set_result(analysis)
+        except Exception as e:
+            pending.set_exception(e)
+            # Mark the exception retrieved in case nobody else was waiting on it
+            pending.exception()
+            raise
+        finally:
+            # Cancelled before it resolved: release the waiters instead of
+            # leaving them on a future nobody will complete
+            if not pending.done():
+                pending.cancel()
+            del self.in_flight[key]
+
+        return copy.deepcopy(analysis)
+
+    async def _load_or_compute(self, key, compute):
+        analysis = await storage.analysis_cache.get_fresh(key, datetime.now())
+        if analysis is not None:
+            self.persistent_hits += 1
+        else:
+            self.misses += 1
+            analysis = await compute()
+            now = datetime.now()
+            await storage.analysis_cache.put(key, analysis, now, now + timedelta(seconds=self.ttl))
+
+        self.memory.set(key, analysis)
+        return analysis
+
+    def stats(self):
+        memory = self.memory.stats()
+        lookups = memory["hits"] + self.persistent_hits + self.misses + self.coalesced
+        return {
+            "memory": memory,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.in_flight),
+            "hit_rate": (lookups - self.misses) / lookups if lookups else 0.0
+        }
+
+analysis_cache = AnalysisCache()
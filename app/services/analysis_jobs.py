@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from app.core.config import ANALYSIS_WORKERS, ANALYSIS_QUEUE_SIZE
+from app.core.metrics import ai_analysis_seconds
+from app.repositories import storage
+from app.services.ai_analysis import run_ai_analysis, fallback_analysis
+
+logger = logging.getLogger(__name__)
+
+class AnalysisJobQueue:
+    """In-process pool of asyncio workers that run AI analyses off the request path.
+
+    Each job is recorded in `analysis_jobs` (queued -> running -> completed or
+    failed) and, when it finishes, writes its analysis onto the snapshot as
+    long as the snapshot still points at that job.
+    """
+
+    def __init__(self, workers=ANALYSIS_WORKERS, maxsize=ANALYSIS_QUEUE_SIZE):
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize)
+        self.tasks = []
+        self.waiters = {}
+
+    async def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def submit(self, job_id, snapshot, city_profile, results):
+        """Record a queued job and hand it to the workers; waits only if the queue is full."""
+        await storage.analysis_jobs.insert({
+            "_id": job_id,
+            "snapshot_id": snapshot["_id"],
+            "status": "queued",
+            "created_at": datetime.now()
+        })
+        await self.queue.put((job_id, snapshot, city_profile, results))
+        return job_id
+
+    async def wait(self, job_id, timeout=None):
+        """The analysis a job produced, once it is done; None if that takes longer than `timeout` seconds."""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(job_id, []).append(future)
+        try:
+            # Registered before checking, so a job finishing in between is not missed
+            job = await storage.analysis_jobs.get(job_id, {"status": 1, "analysis": 1})
+            if job and job["status"] == "completed":
+                return job["analysis"]
+            if job and job["status"] == "failed":
+                return fallback_analysis()
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            futures = self.waiters.get(job_id, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self.waiters.pop(job_id, None)
+
+    async def _worker(self):
+        while True:
+            job_id, snapshot, city_profile, results = await self.queue.get()
+            try:
+                await self._run(job_id, snapshot, city_profile, results)
+            except Exception:
+                logger.exception("Error running analysis job %s", job_id)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id, snapshot, city_profile, results):
+        await storage.analysis_jobs.update(job_id, {"status": "running", "started_at": datetime.now()})
+
+        start = time.perf_counter()
+        try:
+            analysis = await run_ai_analysis(snapshot, city_profile, results)
+            job_update = {"status": "completed", "analysis": analysis}
+            outcome = "success"
+        except Exception as e:
+            logger.exception("Error generating AI analysis for job %s", job_id)
+            analysis = fallback_analysis()
+            job_update = {"status": "failed", "error": str(e)}
+            outcome = "fallback"
+        ai_analysis_seconds.labels(outcome).observe(time.perf_counter() - start)
+
+        job_update["finished_at"] = datetime.now()
+        await storage.snapshots.update(snapshot["_id"], {"ai_analysis": analysis}, match={"ai_analysis_job_id": job_id})
+        await storage.analysis_jobs.update(job_id, job_update)
+
+        for future in self.waiters.pop(job_id, []):
+            if not future.done():
+                future.set_result(analysis)
+
+analysis_jobs = AnalysisJobQueue()
@@ -0,0 +1,133 @@
+import hashlib
+from datetime import datetime
+import numpy as np
+from app.core.config import BASELINE_HORIZON, BASELINE_CACHE_SIZE, BASELINE_CACHE_TTL
+from app.repositories import storage
+from app.services.simulation import simulate_values
+from app.utils.cache import TTLCache
+
+def default_growth_rates(city_profile):
+    """Each profile parameter's default growth rate, aligned with `profile_arrays`."""
+    return np.array([param["default_growth_rate"] for param in city_profile["parameters"]], dtype=float)
+
+def baseline_version(evaluator, default_rates):
+    """Hash of everything a baseline depends on: parameters, base values, defaults and signed score weights.
+
+    A profile update, a catalog category change or new health weights all
+    change it, so stored baselines never need explicit invalidation.
+    """
+    digest = hashlib.sha1()
+    digest.update(",".join(str(param_id) for param_id in evaluator.parameter_ids).encode())
+    for array in (evaluator.base_values, default_rates, evaluator.signed_weights):
+        digest.update(np.ascontiguousarray(array, dtype="<f8").tobytes())
+    digest.update(str(float(evaluator.total_weight)).encode())
+    return digest.hexdigest()
+
+def compute_baseline(evaluator, default_rates, horizon):
+    """Simulate `horizon` terms at the default growth rates, exactly as run_simulation would."""
+    growth_rates = np.repeat(default_rates[:, None], horizon, axis=1)
+    values = simulate_values(evaluator.base_values, growth_rates)
+    return {
+        "horizon": horizon,
+        "parameter_ids": list(evaluator.parameter_ids),
+        "values": values,
+        "health_scores": evaluator.score(np.round(values, 2))
+    }
+
+def encode_baseline(city_id, version, baseline):
+    # Values and scores are stored as packed little-endian float64, not as
+    # per-term documents, so a long horizon stays one small document
+    return {
+        "_id": city_id,
+        "version": version,
+        "horizon": baseline["horizon"],
+        "parameter_ids": baseline["parameter_ids"],
+        "values": baseline["values"].astype("<f8").tobytes(),
+        "health_scores": baseline["health_scores"].astype("<f8").tobytes(),
+        "computed_at": datetime.now()
+    }
+
+def decode_baseline(document):
+    horizon = document["horizon"]
+    return {
+        "horizon": horizon,
+        "parameter_ids": document["parameter_ids"],
+        "values": np.frombuffer(document["values"], dtype="<f8").reshape(-1, horizon),
+        "health_scores": np.frombuffer(document["health_scores"], dtype="<f8")
+    }
+
+class BaselineStore:
+    """Baseline trajectories of city profiles, cached in memory and stored per profile version.
+
+    A baseline is recomputed lazily, on the first read after its profile
+    version changes or when a longer horizon than the stored one is asked
+    for. Returned arrays are shared, so callers must not modify them.
+    """
+
+    def __init__(self, horizon=BASELINE_HORIZON, maxsize=BASELINE_CACHE_SIZE, ttl=BASELINE_CACHE_TTL):
+        self.horizon = horizon
+        self.memory = TTLCache(maxsize, ttl)
+        self.computed = 0
+
+    async def get(self, evaluator, city_profile, terms=None):
+        """The baseline of a compiled profile covering at least `terms` terms (default: the horizon)."""
+        terms = terms or self.horizon
+        default_rates = default_growth_rates(city_profile)
+        version = baseline_version(evaluator, default_rates)
+        key = city_profile["city_id"]
+
+        cached = self.memory.get(key)
+        if cached is not None and cached[0] == version and cached[1]["horizon"] >= terms:
+            return cached[1]
+
+        stored = await storage.baselines.get(key)
+        if stored and stored["version"] == version and stored["horizon"] >= terms:
+            baseline = decode_baseline(stored)
+        else:
+            baseline = compute_baseline(evaluator, default_rates, max(terms, self.horizon))
+            await storage.baselines.replace_many([encode_baseline(key, version, baseline)])
+            self.computed += 1
+        self.memory.set(key, (version, baseline))
+        return baseline
+
+    def stats(self):
+        return {**self.memory.stats(), "computed": self.computed}
+
+def _nullable(rows):
+    return [[None if np.isnan(value) else value for value in row] for row in rows]
+
+def baseline_comparison(baseline, results):
+    """Per-term deltas of stored term results against a baseline, as aligned arrays.
+
+    `values`, `baseline_values` and `value_deltas` are parameters x terms in
+    the order of `parameter_ids`; baseline values are rounded like stored
+    results. A parameter missing from the baseline (the profile changed since
+    the snapshot ran) has null baseline values and deltas.
+    """
+    if not results:
+        return {"terms": [], "parameter_ids": [], "values": [], "baseline_values": [], "value_deltas": [],
+                "health_scores": [], "baseline_health_scores": [], "health_deltas": []}
+
+    parameter_ids = [param["parameter_id"] for param in results[0]["parameters"]]
+    rows = {str(param_id): row for row, param_id in enumerate(baseline["parameter_ids"])}
+    baseline_rows = np.array([rows.get(str(param_id), -1) for param_id in parameter_ids])
+    columns = np.array([term_result["term"] - 1 for term_result in results])
+
+    values = np.array([[param["value"] for param in term_result["parameters"]] for term_result in results]).T
+    baseline_values = np.round(baseline["values"][baseline_rows][:, columns], 2)
+    baseline_values[baseline_rows < 0] = np.nan
+    health_scores = np.array([term_result["economic_health_score"] for term_result in results])
+    baseline_health = baseline["health_scores"][columns]
+
+    return {
+        "terms": (columns + 1).tolist(),
+        "parameter_ids": parameter_ids,
+        "values": values.tolist(),
+        "baseline_values": _nullable(baseline_values.tolist()),
+        "value_deltas": _nullable(np.round(values - baseline_values, 2).tolist()),
+        "health_scores": health_scores.tolist(),
+        "baseline_health_scores": baseline_health.tolist(),
+        "health_deltas": (health_scores - baseline_health).tolist()
+    }
+
+baseline_store = BaselineStore()
@@ -0,0 +1,311 @@
+import asyncio
+import csv
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.repositories import storage, BulkInsertError
+from app.services.history import materialize_history
+from app.services.parameter_catalog import parameter_catalog
+
+# Each kind is also the name of its repository on `storage`
+IMPORT_KINDS = ("countries", "cities", "parameters", "city_profiles")
+
+def decode_line(number, line):
+    try:
+        return number, line.decode("utf-8").rstrip("\r"), None
+    except UnicodeDecodeError as e:
+        return number, None, f"Invalid UTF-8: {str(e)}"
+
+async def iter_lines(chunks):
+    """Split a stream of byte chunks into `(line_number, text, error)`, numbered from 1.
+
+    A line that is not valid UTF-8 comes with an error instead of text, so it
+    is reported like any other bad row instead of aborting the import.
+    """
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield decode_line(number, line)
+    if buffer:
+        yield decode_line(number + 1, buffer)
+
+async def iter_ndjson(lines):
+    """Yield `(line_number, record, error)` for each non-blank NDJSON line."""
+    async for number, line, error in lines:
+        if error:
+            yield number, None, error
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, None, f"Invalid JSON: {str(e)}"
+            continue
+        if isinstance(record, dict):
+            yield number, record, None
+        else:
+            yield number, None, "Expected a JSON object"
+
+async def iter_csv(lines):
+    """Yield `(line_number, record, error)` for each CSV row, keyed by the header row.
+
+    Rows are parsed one line at a time, so quoted values cannot span lines.
+    """
+    header = None
+    async for number, line, error in lines:
+        if error:
+            yield number, None, error
+            continue
+        if not line.strip():
+            continue
+        row = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in row]
+            continue
+        if len(row) != len(header):
+            yield number, None, f"Expected {len(header)} columns, got {len(row)}"
+            continue
+        yield number, {key: (value if value != "" else None) for key, value in zip(header, row)}, None
+
+async def group_profile_rows(records):
+    """Fold flat CSV profile rows into one nested profile record per city.
+
+    Each row holds one historical term of one parameter; consecutive rows for
+    the same city make up that city's profile, so the file must be grouped by
+    city.
+    """
+    current = None
+    key = None
+    async for number, record, error in records:
+        if error:
+            yield number, None, error
+            continue
+        row_key = (record.get("country_code"), record.get("city"))
+        if row_key != key:
+            if current is not None:
+                yield current
+            key = row_key
+            current = (number, {
+                "city": record.get("city"),
+                "country_code": record.get("country_code"),
+                "economic_health_score": record.get("economic_health_score"),
+                "summary": record.get("summary"),
+                "parameters": []
+            }, None)
+        parameters = current[1]["parameters"]
+        if not parameters or parameters[-1]["parameter_code"] != record.get("parameter_code"):
+            parameters.append({
+                "parameter_code": record.get("parameter_code"),
+                "base_value": record.get("base_value"),
+                "default_growth_rate": record.get("default_growth_rate"),
+                "historical_values": []
+            })
+        if record.get("term") is not None:
+            parameters[-1]["historical_values"].append({
+                "term": record["term"],
+                "value": record.get("value"),
+                "growth_rate": record.get("growth_rate"),
+                "date": record.get("date")
+            })
+    if current is not None:
+        yield current
+
+def _number(value, field, cast=float):
+    if value is None:
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a number")
+
+def _required(record, field):
+    value = record.get(field)
+    if value is None:
+        raise ValueError(f"Missing {field}")
+    return value
+
+class ReferenceMaps:
+    """In-memory country, city and parameter lookups used to resolve import references.
+
+    Parameter codes come from the shared parameter catalog, so an import does
+    not scan the parameters collection again.
+    """
+
+    def __init__(self):
+        self.countries = {}
+        self.cities = {}
+        self.parameters = {}
+
+    async def load(self):
+        async for country in storage.countries.find(projection={"code": 1}):
+            self.countries[country["code"]] = country["_id"]
+        country_codes = {country_id: code for code, country_id in self.countries.items()}
+        async for city in storage.cities.find(projection={"name": 1, "country_id": 1}):
+            self.cities[(country_codes.get(city.get("country_id")), city["name"])] = city["_id"]
+        for param_id, param in (await parameter_catalog.all()).items():
+            self.parameters[param["code"]] = ObjectId(param_id)
+        return self
+
+    def country_id(self, record):
+        if record.get("country_id"):
+            return ObjectId(record["country_id"])
+        code = _required(record, "country_code")
+        if code not in self.countries:
+            raise ValueError(f"Unknown country code {code}")
+        return self.countries[code]
+
+    def city_id(self, record):
+        if record.get("city_id"):
+            return ObjectId(record["city_id"])
+        key = (record.get("country_code"), _required(record, "city"))
+        if key in self.cities:
+            return self.cities[key]
+        matches = [city_id for (_, name), city_id in self.cities.items() if name == key[1]]
+        if len(matches) != 1:
+            raise ValueError(f"Cannot resolve city {key[1]}; add country_code or city_id")
+        return matches[0]
+
+    def parameter_id(self, record):
+        if record.get("parameter_id"):
+            return ObjectId(record["parameter_id"])
+        code = _required(record, "parameter_code")
+        if code not in self.parameters:
+            raise ValueError(f"Unknown parameter code {code}")
+        return self.parameters[code]
+
+def _historical_value(value):
+    return {
+        "term": _number(_required(value, "term"), "term", int),
+        "value": _number(_required(value, "value"), "value"),
+        "growth_rate": _number(value.get("growth_rate"), "growth_rate"),
+        "date": value.get("date")
+    }
+
+def build_document(kind, record, references):
+    """Validate one import record and convert it into the document to insert."""
+    if kind == "countries":
+        return {
+            "name": _required(record, "name"),
+            "code": _required(record, "code"),
+            "flag_url": record.get("flag_url"),
+            "description": record.get("description")
+        }
+    if kind == "cities":
+        return {
+            "name": _required(record, "name"),
+            "country_id": references.country_id(record),
+            "description": record.get("description"),
+            "population": _number(record.get("population"), "population", int),
+            "image_url": record.get("image_url")
+        }
+    if kind == "parameters":
+        return {
+            "name": _required(record, "name"),
+            "code": _required(record, "code"),
+            "unit": _required(record, "unit"),
+            "description": record.get("description"),
+            "category": _required(record, "category")
+        }
+    if kind == "city_profiles":
+        health_score = _number(record.get("economic_health_score"), "economic_health_score")
+        return {
+            "city_id": references.city_id(record),
+            "last_updated": datetime.now(),
+            "parameters": [
+                {
+                    "parameter_id": references.parameter_id(param),
+                    "base_value": _number(_required(param, "base_value"), "base_value"),
+                    "default_growth_rate": _number(_required(param, "default_growth_rate"), "default_growth_rate"),
+                    "historical_values": [_historical_value(value) for value in param.get("historical_values") or []]
+                }
+                for param in _required(record, "parameters")
+            ],
+            "economic_health_score": 50.0 if health_score is None else health_score,
+            "summary": record.get("summary")
+        }
+    raise ValueError(f"Unknown import kind {kind}")
+
+async def write_batch(kind, number, documents, line_numbers, parse_errors):
+    """Insert one batch unordered and report what made it in and what did not."""
+    inserted = 0
+    errors = list(parse_errors)
+    failed = set()
+    if documents:
+        try:
+            await getattr(storage, kind).insert_many(documents)
+            inserted = len(documents)
+        except BulkInsertError as e:
+            inserted = e.inserted
+            failed = {error["index"] for error in e.errors}
+            errors.extend(
+                {"line": line_numbers[error["index"]], "error": error["error"]}
+                for error in e.errors
+            )
+    if kind == "city_profiles":
+        await materialize_history([document for i, document in enumerate(documents) if i not in failed])
+    return {
+        "batch": number,
+        "rows": len(documents) + len(parse_errors),
+        "inserted": inserted,
+        "errors": sorted(errors, key=lambda error: error["line"])
+    }
+
+async def import_stream(kind, chunks, format="ndjson", batch_size=1000):
+    """Parse an NDJSON or CSV upload incrementally and insert it in unordered batches.
+
+    Parsing of the next batch overlaps the write of the previous one, so each
+    batch costs one round trip. Bad rows and failed inserts are reported per
+    batch instead of aborting the import.
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(IMPORT_KINDS)}")
+    if format not in ("ndjson", "csv"):
+        raise ValueError("format must be ndjson or csv")
+
+    references = await ReferenceMaps().load()
+    records = iter_ndjson(iter_lines(chunks)) if format == "ndjson" else iter_csv(iter_lines(chunks))
+    if kind == "city_profiles" and format == "csv":
+        records = group_profile_rows(records)
+
+    reports = []
+    pending = None
+    documents, line_numbers, errors = [], [], []
+
+    async def flush():
+        nonlocal pending, documents, line_numbers, errors
+        if pending is not None:
+            reports.append(await pending)
+        pending = asyncio.create_task(
+            write_batch(kind, len(reports) + 1, documents, line_numbers, errors)
+        )
+        documents, line_numbers, errors = [], [], []
+
+    async for number, record, error in records:
+        if error is None:
+            try:
+                documents.append(build_document(kind, record, references))
+                line_numbers.append(number)
+            except (ValueError, TypeError, AttributeError, InvalidId) as e:
+                error = str(e)
+        if error is not None:
+            errors.append({"line": number, "error": error})
+        if len(documents) + len(errors) >= batch_size:
+            await flush()
+
+    if documents or errors:
+        await flush()
+    if pending is not None:
+        reports.append(await pending)
+
+    return {
+        "kind": kind,
+        "inserted": sum(report["inserted"] for report in reports),
+        "failed": sum(len(report["errors"]) for report in reports),
+        "batches": reports
+    }
@@ -0,0 +1,95 @@
+import numpy as np
+
+COMPARE_FIELDS = ("values", "deltas", "health")
+
+def comparison_projection(fields):
+    """Fetch only the parts of stored term results that the requested fields need."""
+    projection = {"name": 1, "city_id": 1, "results.term": 1, "results.economic_health_score": 1}
+    if "values" in fields or "deltas" in fields:
+        projection["results.parameters.parameter_id"] = 1
+        projection["results.parameters.value"] = 1
+    return projection
+
+def align_results(snapshots, parameter_ids=None):
+    """Stack the term results of snapshots into aligned arrays.
+
+    Returns the parameter ids (unless given, those of each snapshot's first
+    term result in first-seen order), snapshots x parameters x terms values and snapshots x terms health
+    scores, with NaN wherever a snapshot has no result for a term or parameter.
+    """
+    results = [snapshot.get("results") or [] for snapshot in snapshots]
+    terms = max((term_result["term"] for rows in results for term_result in rows), default=0)
+    if parameter_ids is None:
+        parameter_ids = list(dict.fromkeys(
+            str(param["parameter_id"]) for rows in results for term_result in rows[:1]
+            for param in term_result.get("parameters", [])
+        ))
+    positions = {param_id: row for row, param_id in enumerate(parameter_ids)}
+
+    values = np.full((len(snapshots), len(parameter_ids), terms), np.nan)
+    health_scores = np.full((len(snapshots), terms), np.nan)
+    for s, rows in enumerate(results):
+        layout = None
+        for term_result in rows:
+            column = term_result["term"] - 1
+            health_scores[s, column] = term_result["economic_health_score"]
+            params = term_result.get("parameters")
+            if not params:
+                continue
+            # Every term of a snapshot normally lists the same parameters in the
+            # same order, so the row mapping is only rebuilt when that changes
+            ids = [param["parameter_id"] for param in params]
+            if layout is None or layout[0] != ids:
+                pairs = [(i, positions[str(param_id)]) for i, param_id in enumerate(ids) if str(param_id) in positions]
+                layout = (ids, [i for i, _ in pairs], [row for _, row in pairs])
+            if layout[1]:
+                values[s, layout[2], column] = [params[i]["value"] for i in layout[1]]
+    return parameter_ids, values, health_scores
+
+def _nullable(array):
+    return np.where(np.isnan(array), None, array).tolist()
+
+def first_term(mask):
+    terms = np.flatnonzero(mask)
+    return int(terms[0]) + 1 if len(terms) else None
+
+def compare_results(snapshots, parameter_ids=None, fields=COMPARE_FIELDS, threshold=0.01):
+    """Compare the stored results of snapshots term by term, against the first one.
+
+    Parameter values and health scores come back as aligned arrays with one
+    row per snapshot, deltas with one row per snapshot after the reference,
+    and only the requested `fields` are built. `divergence.term` is the first
+    term all snapshots have a result for whose health scores are more than
+    `threshold` apart; `divergence.snapshots` is each snapshot's first term
+    more than `threshold` away from the reference.
+    """
+    parameter_ids, values, health_scores = align_results(snapshots, parameter_ids)
+    complete = ~np.isnan(health_scores).any(axis=0)
+    spread = np.full(health_scores.shape[1], np.nan)
+    spread[complete] = np.ptp(health_scores[:, complete], axis=0)
+    with np.errstate(invalid="ignore"):
+        health_deltas = health_scores[1:] - health_scores[0]
+        divergence = {
+            "threshold": threshold,
+            "term": first_term(spread > threshold),
+            "max_spread": float(np.nanmax(spread)) if complete.any() else None,
+            "max_spread_term": int(np.nanargmax(spread)) + 1 if complete.any() else None,
+            "snapshots": [None] + [first_term(np.abs(deltas) > threshold) for deltas in health_deltas]
+        }
+
+    comparison = {"terms": list(range(1, health_scores.shape[1] + 1)), "divergence": divergence}
+    if "health" in fields:
+        comparison["health_scores"] = _nullable(health_scores)
+        comparison["health_deltas"] = _nullable(health_deltas)
+    if "values" in fields or "deltas" in fields:
+        value_deltas = np.round(values[1:] - values[0], 2)
+        parameters = []
+        for row, param_id in enumerate(parameter_ids):
+            parameter = {"parameter_id": param_id}
+            if "values" in fields:
+                parameter["values"] = _nullable(values[:, row])
+            if "deltas" in fields:
+                parameter["deltas"] = _nullable(value_deltas[:, row])
+            parameters.append(parameter)
+        comparison["parameters"] = parameters
+    return comparison
@@ -0,0 +1,109 @@
+from datetime import datetime
+from itertools import chain
+import numpy as np
+from app.core.config import HISTORY_ROLLING_WINDOW
+from app.repositories import storage
+
+def history_matrix(series):
+    """Stack variable-length value series into a rows x terms matrix, padded with NaN at the end."""
+    lengths = np.array([len(values) for values in series], dtype=int)
+    width = int(lengths.max()) if len(lengths) else 0
+    matrix = np.full((len(series), width), np.nan)
+    matrix[np.arange(width) < lengths[:, None]] = np.fromiter(
+        chain.from_iterable(series), dtype=float, count=int(lengths.sum())
+    )
+    return matrix, lengths
+
+def history_statistics(matrix, lengths, window):
+    """Summary statistics of every row of a NaN-padded history matrix at once.
+
+    `cagr` is the compound growth rate per term and `volatility` the sample
+    standard deviation of term-on-term changes, both in percent. Statistics
+    a row has too few terms for (or a non-positive start for CAGR) are NaN.
+    `rolling_mean` is rows x (terms - window + 1); row r is valid for its
+    first `lengths[r] - window + 1` columns.
+    """
+    rows = np.arange(len(lengths))
+    counts = np.maximum(lengths, 1)
+    filled = np.nan_to_num(matrix)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first = matrix[:, 0] if matrix.shape[1] else np.full(len(lengths), np.nan)
+        last = matrix[rows, np.maximum(lengths - 1, 0)] if matrix.shape[1] else first
+        mean = np.where(lengths > 0, filled.sum(axis=1) / counts, np.nan)
+
+        changes = (matrix[:, 1:] / matrix[:, :-1] - 1) * 100
+        changes[~np.isfinite(changes)] = np.nan
+        change_counts = np.isfinite(changes).sum(axis=1)
+        change_means = np.nansum(changes, axis=1) / np.maximum(change_counts, 1)
+        squares = np.nansum((changes - change_means[:, None]) ** 2, axis=1)
+        volatility = np.where(change_counts >= 2, np.sqrt(squares / np.maximum(change_counts - 1, 1)), np.nan)
+
+        growth = np.where((lengths >= 2) & (first > 0) & (last > 0), last / first, np.nan)
+        cagr = (growth ** (1 / np.maximum(lengths - 1, 1)) - 1) * 100
+
+    sums = np.concatenate([np.zeros((len(lengths), 1)), np.cumsum(filled, axis=1)], axis=1)
+    rolling_mean = (sums[:, window:] - sums[:, :-window]) / window if matrix.shape[1] >= window else np.empty((len(lengths), 0))
+
+    return {
+        "first_value": first,
+        "last_value": last,
+        "min": np.fmin.reduce(matrix, axis=1) if matrix.shape[1] else first,
+        "max": np.fmax.reduce(matrix, axis=1) if matrix.shape[1] else first,
+        "mean": mean,
+        "cagr": cagr,
+        "volatility": volatility,
+        "rolling_mean": rolling_mean
+    }
+
+def _number(value):
+    return None if np.isnan(value) else value
+
+def history_documents(city_profiles, country_ids, window=HISTORY_ROLLING_WINDOW, computed_at=None):
+    """Build the stored history analytics of city profiles, one document per city.
+
+    Every parameter of every profile is one row of a single padded matrix, so a
+    bulk import or rebuild is summarized in one pass. Historical values are
+    taken in their stored order, oldest first.
+    """
+    computed_at = computed_at or datetime.now()
+    params = [param for profile in city_profiles for param in profile["parameters"]]
+    matrix, lengths = history_matrix(
+        [[value["value"] for value in param.get("historical_values") or []] for param in params]
+    )
+    stats = history_statistics(matrix, lengths, window)
+    columns = {name: values.tolist() for name, values in stats.items() if name != "rolling_mean"}
+
+    documents = []
+    row = 0
+    for profile in city_profiles:
+        parameters = []
+        for param in profile["parameters"]:
+            parameters.append({
+                "parameter_id": param["parameter_id"],
+                "terms": int(lengths[row]),
+                **{name: _number(values[row]) for name, values in columns.items()},
+                "rolling_mean": stats["rolling_mean"][row, :max(0, lengths[row] - window + 1)].tolist()
+            })
+            row += 1
+        documents.append({
+            "_id": profile["city_id"],
+            "city_id": profile["city_id"],
+            "country_id": country_ids.get(profile["city_id"]),
+            "profile_updated": profile.get("last_updated"),
+            "computed_at": computed_at,
+            "window": window,
+            "parameters": parameters
+        })
+    return documents
+
+async def materialize_history(city_profiles):
+    """Recompute and store the history analytics of city profiles that were just written."""
+    if not city_profiles:
+        return []
+    cities = await storage.cities.find_in(
+        "_id", list({profile["city_id"] for profile in city_profiles}), {"country_id": 1}
+    )
+    documents = history_documents(city_profiles, {city["_id"]: city.get("country_id") for city in cities})
+    await storage.history_analytics.replace_many(documents)
+    return documents
@@ -0,0 +1,53 @@
+import asyncio
+import json
+from app.core.config import OPENAI_API_KEY, LLM_BACKEND, LLM_MODEL, LLM_STUB_DELAY
+
+class OpenAIClient:
+    """Chat completions through the async OpenAI SDK, so calls never block the event loop."""
+
+    def __init__(self, api_key=OPENAI_API_KEY, model=LLM_MODEL):
+        import openai
+        self.client = openai.AsyncOpenAI(api_key=api_key)
+        self.model = model
+
+    async def complete_json(self, system_prompt, prompt):
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"}
+        )
+        return response.choices[0].message.content
+
+    async def close(self):
+        await self.client.close()
+
+class StubLLMClient:
+    """Local stand-in for the LLM that answers every prompt with a fixed analysis."""
+
+    def __init__(self, delay=LLM_STUB_DELAY):
+        self.delay = delay
+        self.calls = 0
+
+    async def complete_json(self, system_prompt, prompt):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return json.dumps({
+            "summary": "Stub analysis generated without an LLM.",
+            "impacts": [],
+            "recommendations": "No recommendations from the stub client.",
+            "comparison_to_default": "Not compared by the stub client."
+        })
+
+    async def close(self):
+        pass
+
+def create_llm_client(backend=LLM_BACKEND):
+    if backend == "openai":
+        return OpenAIClient()
+    if backend == "stub":
+        return StubLLMClient()
+    raise ValueError(f"Unknown LLM backend: {backend}")
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from app.core.config import PARAMETER_CATALOG_MISS_REFRESH
+from app.repositories import storage, ChangeStreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FIELDS = {"code": 1, "name": 1, "unit": 1, "category": 1}
+
+class ParameterCatalog:
+    """Process-wide in-memory copy of the `economic_parameters` collection.
+
+    The whole catalog is loaded with one query on first use and served from a
+    dict keyed by the string form of each parameter id. Writes through this
+    app call `invalidate()`; writes from other processes are picked up by the
+    optional change-stream watcher, or by a reload when an unknown id is
+    looked up (at most once every PARAMETER_CATALOG_MISS_REFRESH seconds).
+    `generation` changes whenever the served entries may have changed.
+    """
+
+    def __init__(self, miss_refresh=PARAMETER_CATALOG_MISS_REFRESH):
+        self.miss_refresh = miss_refresh
+        self.entries = None
+        self.loaded_at = 0.0
+        self.generation = 0
+        self.lock = asyncio.Lock()
+        self.watch_task = None
+
+    async def refresh(self):
+        generation = self.generation
+        entries = {}
+        async for param in storage.parameters.find(projection=CATALOG_FIELDS):
+            entries[str(param["_id"])] = {
+                "code": param.get("code"),
+                "name": param.get("name"),
+                "unit": param.get("unit"),
+                "category": param.get("category")
+            }
+        # An invalidation while the load was in flight may mean it read the old
+        # catalog, so the result only serves this caller and is not kept
+        if generation == self.generation:
+            self.entries = entries
+            self.loaded_at = time.monotonic()
+            self.generation += 1
+        return entries
+
+    async def all(self):
+        entries = self.entries
+        if entries is None:
+            async with self.lock:
+                entries = self.entries
+                if entries is None:
+                    entries = await self.refresh()
+        return entries
+
+    async def lookup(self, parameter_ids):
+        """Map each id (ObjectId or string) to its catalog entry, skipping unknown ids."""
+        entries = await self.all()
+        keys = [str(param_id) for param_id in parameter_ids]
+        if any(key not in entries for key in keys) and time.monotonic() - self.loaded_at > self.miss_refresh:
+            async with self.lock:
+                entries = await self.refresh()
+        return {key: entries[key] for key in keys if key in entries}
+
+    async def get(self, parameter_id):
+        return (await self.lookup([parameter_id])).get(str(parameter_id))
+
+    def invalidate(self):
+        self.generation += 1
+        self.entries = None
+
+    async def start_watch(self):
+        if self.watch_task is None and storage.parameters.supports_change_streams:
+            self.watch_task = asyncio.create_task(self._watch())
+
+    async def stop_watch(self):
+        if self.watch_task is not None:
+            self.watch_task.cancel()
+            await asyncio.gather(self.watch_task, return_exceptions=True)
+            self.watch_task = None
+
+    async def _watch(self):
+        try:
+            async for change in storage.parameters.watch_changes():
+                self.invalidate()
+        except ChangeStreamUnavailable as e:
+            # Standalone Mongo servers have no change streams; fall back to
+            # explicit invalidation
+            logger.info("Parameter catalog change stream unavailable: %s", e)
+
+parameter_catalog = ParameterCatalog()
@@ -0,0 +1,173 @@
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import time
+from datetime import datetime
+from bson import ObjectId
+from app.core.config import PROFILE_DIR, PROFILE_STORE_LIMIT, PROFILING_HEADER
+from app.services.read_cache import city_profile_cache, snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "calls")
+
+class ProfileStore:
+    """Bounded directory of cProfile dumps, each next to a JSON metadata file.
+
+    Profile ids are ObjectIds, so sorting them orders profiles by creation;
+    the oldest are deleted once there are more than `limit`. The `.prof`
+    files are plain pstats dumps that snakeviz or `python -m pstats` can open.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, limit=PROFILE_STORE_LIMIT):
+        self.directory = directory
+        self.limit = limit
+
+    def path(self, profile_id, extension):
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def ids(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def save(self, profiler, metadata):
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(self.path(metadata["id"], "prof"))
+        with open(self.path(metadata["id"], "json"), "w") as f:
+            json.dump(metadata, f)
+        self.prune()
+
+    def prune(self):
+        for profile_id in self.ids()[:-self.limit]:
+            for extension in ("json", "prof"):
+                try:
+                    os.remove(self.path(profile_id, extension))
+                except FileNotFoundError:
+                    pass
+
+    def get(self, profile_id):
+        if not ObjectId.is_valid(profile_id):
+            return None
+        try:
+            with open(self.path(profile_id, "json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self):
+        return [metadata for metadata in map(self.get, reversed(self.ids())) if metadata]
+
+    def stats(self, profile_id):
+        """Per-function rows of a stored profile, keyed like pstats prints them."""
+        if self.get(profile_id) is None:
+            return None
+        return {
+            pstats.func_std_string(func): {"calls": calls, "primitive_calls": primitive_calls,
+                                           "tottime": tottime, "cumtime": cumtime}
+            for func, (primitive_calls, calls, tottime, cumtime, _) in
+            pstats.Stats(self.path(profile_id, "prof")).stats.items()
+        }
+
+def top_functions(stats, sort="cumulative", limit=30):
+    key = {"cumulative": "cumtime", "tottime": "tottime", "calls": "calls"}[sort]
+    rows = sorted(stats.items(), key=lambda item: item[1][key], reverse=True)[:limit]
+    return [{"function": function, **row} for function, row in rows]
+
+def diff_stats(base, other, limit=50):
+    """Functions whose cumulative time changed most between two profiles, with both sides' numbers."""
+    empty = {"calls": 0, "primitive_calls": 0, "tottime": 0.0, "cumtime": 0.0}
+    rows = []
+    for function in base.keys() | other.keys():
+        before, after = base.get(function, empty), other.get(function, empty)
+        rows.append({
+            "function": function,
+            "base": before,
+            "other": after,
+            "calls_delta": after["calls"] - before["calls"],
+            "tottime_delta": after["tottime"] - before["tottime"],
+            "cumtime_delta": after["cumtime"] - before["cumtime"]
+        })
+    rows.sort(key=lambda row: abs(row["cumtime_delta"]), reverse=True)
+    return rows[:limit]
+
+class ProfilingMiddleware:
+    """ASGI middleware running cProfile around requests that send the profiling header.
+
+    The profile is saved with the route, snapshot id and, for snapshot
+    routes, the plan's term and parameter counts; its id is returned in an
+    `X-Profile-Id` response header. One request is profiled at a time, since
+    cProfile sees everything on the event loop thread; a request asking for a
+    profile while another is running is served unprofiled. Only installed
+    when PROFILING_ENABLED is set, so other deployments do not run it at all.
+    """
+
+    def __init__(self, app, store=None, header=PROFILING_HEADER):
+        self.app = app
+        self.store = store or profile_store
+        self.header = header.lower().encode("latin-1")
+        self.active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.active or not any(
+            name == self.header for name, _ in scope["headers"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = str(ObjectId())
+        status = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        self.active = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            self.active = False
+            duration = time.perf_counter() - start
+            try:
+                metadata = await describe_request(scope, profile_id, status, duration)
+                await asyncio.to_thread(self.store.save, profiler, metadata)
+            except Exception:
+                logger.exception("Error saving profile %s", profile_id)
+
+async def describe_request(scope, profile_id, status, duration):
+    route = scope.get("route")
+    snapshot_id = scope.get("path_params", {}).get("snapshot_id")
+    metadata = {
+        "id": profile_id,
+        "created_at": datetime.now().isoformat(),
+        "method": scope["method"],
+        "path": scope["path"],
+        "route": route.path if route is not None else "unmatched",
+        "status": status,
+        "duration_seconds": duration,
+        "snapshot_id": snapshot_id,
+        "terms": None,
+        "parameters": None
+    }
+
+    # The handler has just loaded both documents, so these are cache hits
+    if snapshot_id and ObjectId.is_valid(snapshot_id):
+        snapshot = await snapshot_cache.get(ObjectId(snapshot_id))
+        if snapshot:
+            metadata["terms"] = sum(stage["terms"] for stage in snapshot["stages"])
+            city_profile = await city_profile_cache.get(snapshot["city_id"])
+            if city_profile:
+                metadata["parameters"] = len(city_profile["parameters"])
+    return metadata
+
+profile_store = ProfileStore()
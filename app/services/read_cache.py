@@ -0,0 +1,63 @@
+from app.core.config import READ_CACHE_SIZE, READ_CACHE_TTL
+from app.repositories import storage
+from app.utils.cache import TTLCache
+
+# The parts of a snapshot that only PUT /snapshots/{id} changes; everything a
+# simulation run writes is left out so runs never have to invalidate
+SNAPSHOT_DEFINITION_PROJECTION = {
+    "results": 0,
+    "results_count": 0,
+    "cursor": 0,
+    "ai_analysis": 0,
+    "ai_analysis_job_id": 0,
+    "is_completed": 0
+}
+
+class ReadThroughCache:
+    """In-process TTL LRU in front of one repository read.
+
+    Misses are loaded with `load(key)` and cached unless the document does
+    not exist. Routes that write the underlying documents call `invalidate()`;
+    other processes' writes show up once the entry's TTL runs out. Cached
+    documents are shared between requests, so callers must not mutate them.
+    """
+
+    def __init__(self, load, maxsize=READ_CACHE_SIZE, ttl=READ_CACHE_TTL):
+        self.load = load
+        self.memory = TTLCache(maxsize, ttl)
+        self.generation = 0
+        self.invalidations = 0
+
+    async def get(self, key):
+        document = self.memory.get(key)
+        if document is not None:
+            return document
+
+        # An invalidation while the load is in flight may mean it read the old
+        # document, so only cache the result if none happened
+        generation = self.generation
+        document = await self.load(key)
+        if document is not None and generation == self.generation:
+            self.memory.set(key, document)
+        return document
+
+    def invalidate(self, key):
+        self.generation += 1
+        self.invalidations += 1
+        self.memory.invalidate(key)
+
+    def clear(self):
+        self.generation += 1
+        self.invalidations += 1
+        self.memory.clear()
+
+    def stats(self):
+        return {**self.memory.stats(), "invalidations": self.invalidations}
+
+city_profile_cache = ReadThroughCache(lambda city_id: storage.city_profiles.get_by_city(city_id))
+# Compiled HealthEvaluators keyed by profile `_id`, profile `last_updated` and
+# parameter catalog generation (see load_health_evaluator). A profile write
+# or catalog change moves readers to a new key, so stale entries are never
+# hit again and just age out
+evaluator_cache = TTLCache(READ_CACHE_SIZE, READ_CACHE_TTL)
+snapshot_cache = ReadThroughCache(lambda snapshot_id: storage.snapshots.get(snapshot_id, SNAPSHOT_DEFINITION_PROJECTION))
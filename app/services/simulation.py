@@ -1,40 +1,527 @@
-from app.core.database import city_profiles_collection, economic_parameters_collection
+import numpy as np
 from bson import ObjectId
+from app.core.config import HEALTH_CATEGORY_WEIGHTS, HEALTH_CATEGORY_DIRECTIONS
+from app.core.metrics import simulation_seconds, health_score_seconds
+from app.utils.metrics import timed
+from app.services.parameter_catalog import parameter_catalog
+from app.services.read_cache import evaluator_cache
 
-def calculate_economic_health(parameters, city_profile):
-    total_weight = 0
-    weighted_sum = 0
-    
-    for param in parameters:
-        param_id = str(param["parameter_id"])
-        param_value = param["value"]
-        
-        base_value = None
-        for base_param in city_profile["parameters"]:
-            if str(base_param["parameter_id"]) == param_id:
-                base_value = base_param["base_value"]
+def profile_arrays(city_profile):
+    """Return the profile's parameter ids and their base values as an aligned array."""
+    parameter_ids = [param["parameter_id"] for param in city_profile["parameters"]]
+    base_values = np.array([param["base_value"] for param in city_profile["parameters"]], dtype=float)
+    return parameter_ids, base_values
+
+def stage_growth_matrix(parameter_ids, stages):
+    """Expand simulation stages into a parameters x terms matrix of growth rates.
+
+    Parameters a stage does not mention keep a growth rate of 0 for that stage.
+    """
+    index = {str(param_id): i for i, param_id in enumerate(parameter_ids)}
+    total_terms = sum(stage["terms"] for stage in stages)
+    growth_rates = np.zeros((len(parameter_ids), total_terms))
+
+    offset = 0
+    for stage in stages:
+        end = offset + stage["terms"]
+        for param in stage["parameters"]:
+            row = index.get(str(param["parameter_id"]))
+            if row is not None:
+                growth_rates[row, offset:end] = param["growth_rate"]
+        offset = end
+
+    return growth_rates
+
+def simulate_values(start_values, growth_rates):
+    """Compound the start values through every term of the growth matrix.
+
+    The start values are prepended as the first column so the running product
+    multiplies in the same order as stepping term by term. Start values may
+    carry leading axes (e.g. cities x parameters); the growth matrix is
+    broadcast across them.
+    """
+    start_values = np.asarray(start_values, dtype=float)
+    factors = np.empty(start_values.shape + (growth_rates.shape[-1] + 1,))
+    factors[..., 0] = start_values
+    factors[..., 1:] = 1 + growth_rates / 100
+    return np.multiply.accumulate(factors, axis=-1)[..., 1:]
+
+# Built-in scoring direction per parameter code: +1 when a rise is healthy,
+# -1 when a fall is. Codes not listed here score as +1.
+DEFAULT_CODE_DIRECTIONS = {
+    "GDP": 1,
+    "INVEST": 1,
+    "UNEMP": -1,
+    "INFL": -1
+}
+
+class HealthEvaluator:
+    """Economic health scorer compiled once per city profile.
+
+    `parameter_metadata` maps each parameter id (as a string) to its catalog
+    entry, of which `code` and `category` are used. Directions come from the
+    category setting if there is one, otherwise from DEFAULT_CODE_DIRECTIONS;
+    weights come from the category setting and default to 1. Parameters with a
+    base value of 0 get no weight.
+
+    The score of a term is 50 plus the weighted average of signed relative
+    changes from the base values, scaled by 50 and clamped to 0-100.
+    """
+
+    def __init__(self, city_profile, parameter_metadata, category_weights=None, category_directions=None):
+        category_weights = category_weights or {}
+        category_directions = category_directions or {}
+
+        self.parameter_ids, self.base_values = profile_arrays(city_profile)
+
+        signs = []
+        weights = []
+        for param_id, base_value in zip(self.parameter_ids, self.base_values):
+            metadata = parameter_metadata.get(str(param_id), {})
+            category = metadata.get("category")
+            direction = category_directions.get(category, DEFAULT_CODE_DIRECTIONS.get(metadata.get("code"), 1))
+            signs.append(1 if direction >= 0 else -1)
+            weights.append(category_weights.get(category, 1) if base_value != 0 else 0)
+
+        weights = np.array(weights, dtype=float)
+        self.total_weight = weights.sum()
+        self.safe_base_values = np.where(self.base_values == 0, 1, self.base_values)
+        self.signed_weights = np.array(signs) * weights
+
+    @timed(health_score_seconds)
+    def score(self, values):
+        """Score a parameters x terms matrix; extra trailing axes are scored too."""
+        if self.total_weight == 0:
+            return np.full(values.shape[1:], 50.0)
+
+        # The operations are those of the original per-parameter loop, in its
+        # order (change x signed weight x 50, summed parameter by parameter,
+        # then / total weight), so scores match it to the last bit however
+        # many terms are scored at once; /simulate, /advance and streamed
+        # blocks must agree. Neither a BLAS dot nor weighted.sum(axis=0) keeps
+        # that order: numpy sums pairwise when a row is a single term
+        shape = (-1,) + (1,) * (values.ndim - 1)
+        weighted = values / self.safe_base_values.reshape(shape)
+        weighted -= 1
+        weighted *= self.signed_weights.reshape(shape)
+        weighted *= 50
+        total = weighted[0].copy()
+        for row in weighted[1:]:
+            total += row
+        total /= self.total_weight
+        return np.clip(50 + total, 0, 100)
+
+def evaluator_key(city_profile, generation):
+    # Every profile write sets last_updated, and every catalog change bumps its generation
+    return (city_profile["_id"], city_profile.get("last_updated"), generation)
+
+async def load_health_evaluator(city_profile):
+    """The HealthEvaluator of a profile, compiled with codes from the parameter catalog once per version."""
+    return (await load_health_evaluators([city_profile]))[0]
+
+async def load_health_evaluators(city_profiles):
+    """Evaluators for many profiles; those not cached are compiled after a single catalog lookup."""
+    generation = parameter_catalog.generation
+    keys = [evaluator_key(profile, generation) for profile in city_profiles]
+    evaluators = [evaluator_cache.get(key) for key in keys]
+    missing = [i for i, evaluator in enumerate(evaluators) if evaluator is None]
+    if not missing:
+        return evaluators
+
+    parameter_metadata = await parameter_catalog.lookup(
+        param["parameter_id"] for i in missing for param in city_profiles[i]["parameters"]
+    )
+    for i in missing:
+        evaluators[i] = HealthEvaluator(
+            city_profiles[i], parameter_metadata, HEALTH_CATEGORY_WEIGHTS, HEALTH_CATEGORY_DIRECTIONS
+        )
+        # Metadata loaded after a catalog change belongs to the next generation
+        if generation == parameter_catalog.generation:
+            evaluator_cache.set(keys[i], evaluators[i])
+    return evaluators
+
+def build_term_results(parameter_ids, values, growth_rates, health_scores, first_term=1):
+    """Convert engine arrays back into the `results` documents stored on a snapshot.
+
+    Values are rounded with Python's `round` here rather than `np.round`, which
+    drifts in the last cent once values pass ~1e12.
+    """
+    parameter_ids = [ObjectId(param_id) for param_id in parameter_ids]
+    value_columns = values.T.tolist()
+    growth_columns = growth_rates.T.tolist()
+
+    results = []
+    for t, health_score in enumerate(health_scores.tolist()):
+        results.append({
+            "term": first_term + t,
+            "parameters": [
+                {
+                    "parameter_id": param_id,
+                    "value": round(value, 2),
+                    "growth_rate": growth_rate
+                }
+                for param_id, value, growth_rate in zip(parameter_ids, value_columns[t], growth_columns[t])
+            ],
+            "economic_health_score": health_score
+        })
+
+    return results
+
+def cursor_state(term_result):
+    """The small slice of a term result that the next /advance step starts from."""
+    return {
+        "term": term_result["term"],
+        "parameters": [
+            {"parameter_id": param["parameter_id"], "value": param["value"]}
+            for param in term_result["parameters"]
+        ]
+    }
+
+@timed(simulation_seconds.labels("run"))
+def run_simulation(evaluator, stages, start_values=None, first_term=1):
+    """Simulate every term of `stages` for a compiled profile in one array computation.
+
+    Values are carried at full precision between terms and rounded to two
+    decimals for the stored results, which are also what the health score is
+    computed from.
+    """
+    if start_values is None:
+        start_values = evaluator.base_values
+
+    growth_rates = stage_growth_matrix(evaluator.parameter_ids, stages)
+    values = simulate_values(start_values, growth_rates)
+    health_scores = evaluator.score(np.round(values, 2))
+
+    return build_term_results(evaluator.parameter_ids, values, growth_rates, health_scores, first_term)
+
+def iter_simulation_blocks(evaluator, stages, block_terms):
+    """Yield the term results of `stages` in blocks of at most `block_terms` terms.
+
+    Each block starts from the previous block's full-precision values, so the
+    concatenated blocks equal a single run_simulation, and the first block
+    costs the same however long the horizon is.
+    """
+    growth_rates = stage_growth_matrix(evaluator.parameter_ids, stages)
+    current = evaluator.base_values
+    block_timer = simulation_seconds.labels("stream_block")
+    for start in range(0, growth_rates.shape[1], block_terms):
+        with block_timer.time():
+            block_rates = growth_rates[:, start:start + block_terms]
+            values = simulate_values(current, block_rates)
+            current = values[:, -1]
+            health_scores = evaluator.score(np.round(values, 2))
+            block = build_term_results(evaluator.parameter_ids, values, block_rates, health_scores, start + 1)
+        yield block
+
+def stage_rate_distributions(parameter_ids, stages, distributions):
+    """Build per-stage arrays of growth-rate means, spreads and uniform flags.
+
+    Each entry of `distributions` overrides one `(stage_number, parameter_id)`
+    pair; every other parameter keeps the stage's fixed growth rate.
+    """
+    index = {str(param_id): i for i, param_id in enumerate(parameter_ids)}
+    stage_index = {stage["stage_number"]: s for s, stage in enumerate(stages)}
+
+    means = np.zeros((len(stages), len(parameter_ids)))
+    spreads = np.zeros_like(means)
+    uniform = np.zeros_like(means, dtype=bool)
+
+    for s, stage in enumerate(stages):
+        for param in stage["parameters"]:
+            row = index.get(str(param["parameter_id"]))
+            if row is not None:
+                means[s, row] = param["growth_rate"]
+
+    for dist in distributions:
+        s = stage_index.get(dist["stage_number"])
+        if s is None:
+            raise ValueError(f"Unknown stage_number {dist['stage_number']}")
+        row = index.get(str(dist["parameter_id"]))
+        if row is None:
+            raise ValueError(f"Parameter {dist['parameter_id']} is not part of the city profile")
+        if dist.get("mean") is not None:
+            means[s, row] = dist["mean"]
+        spreads[s, row] = dist["spread"]
+        uniform[s, row] = dist["distribution"] == "uniform"
+
+    return means, spreads, uniform
+
+@timed(simulation_seconds.labels("monte_carlo"))
+def run_monte_carlo(evaluator, stages, distributions, paths, seed=None,
+                    percentiles=(5, 50, 95), block_elements=8_000_000):
+    """Simulate `paths` random trajectories and reduce them to percentile bands.
+
+    Every path draws one growth rate per stage and parameter and holds it for
+    the stage's terms. Paths are only ever held as a parameters x terms x paths
+    block sized to `block_elements`, which is reduced to percentiles before the
+    next block is simulated, so memory does not grow with the horizon.
+
+    Returns `(parameter_ids, value_bands, health_bands)` with shapes
+    percentiles x parameters x terms and percentiles x terms.
+    """
+    if any(q < 0 or q > 100 for q in percentiles):
+        raise ValueError("Percentiles must be between 0 and 100")
+
+    parameter_ids, base_values = evaluator.parameter_ids, evaluator.base_values
+    means, spreads, uniform = stage_rate_distributions(parameter_ids, stages, distributions)
+    rng = np.random.default_rng(seed)
+
+    n_params = len(parameter_ids)
+    total_terms = sum(stage["terms"] for stage in stages)
+    value_bands = np.empty((len(percentiles), n_params, total_terms))
+    health_bands = np.empty((len(percentiles), total_terms))
+    block_terms = max(1, block_elements // max(1, n_params * paths))
+
+    current = np.repeat(base_values[:, None], paths, axis=1)
+    offset = 0
+    for s, stage in enumerate(stages):
+        noise = np.where(
+            uniform[s][:, None],
+            rng.uniform(-1, 1, (n_params, paths)),
+            rng.standard_normal((n_params, paths))
+        )
+        factors = 1 + (means[s][:, None] + spreads[s][:, None] * noise) / 100
+
+        for start in range(0, stage["terms"], block_terms):
+            steps = min(block_terms, stage["terms"] - start)
+            block = np.empty((n_params, steps, paths))
+            np.multiply(current, factors, out=block[:, 0, :])
+            for k in range(1, steps):
+                np.multiply(block[:, k - 1, :], factors, out=block[:, k, :])
+            end = offset + steps
+
+            value_bands[:, :, offset:end] = np.percentile(block, percentiles, axis=2)
+            health_bands[:, offset:end] = np.percentile(evaluator.score(block), percentiles, axis=1)
+
+            current = block[:, -1, :].copy()
+            offset = end
+
+    return parameter_ids, value_bands, health_bands
+
+@timed(simulation_seconds.labels("batch"))
+def run_batch_simulation(evaluators, stages):
+    """Apply one stage plan to many compiled profiles in a single cities x parameters x terms computation.
+
+    Profiles are aligned on the union of their parameters; a parameter a city
+    does not have is carried with a base value of 0 and left out of its score.
+    Returns the union parameter ids, the parameters x terms growth matrix, the
+    cities x parameters x terms values, the cities x terms health scores and,
+    per city, the rows of its own parameters in profile order.
+    """
+    parameter_ids = []
+    index = {}
+    rows = []
+    for evaluator in evaluators:
+        city_rows = []
+        for param_id in evaluator.parameter_ids:
+            key = str(param_id)
+            if key not in index:
+                index[key] = len(parameter_ids)
+                parameter_ids.append(param_id)
+            city_rows.append(index[key])
+        rows.append(city_rows)
+
+    base_values = np.zeros((len(evaluators), len(parameter_ids)))
+    for c, (evaluator, city_rows) in enumerate(zip(evaluators, rows)):
+        base_values[c, city_rows] = evaluator.base_values
+
+    growth_rates = stage_growth_matrix(parameter_ids, stages)
+    values = simulate_values(base_values, growth_rates)
+
+    # Each city is scored by its own evaluator on its own rows, so a batch
+    # score is exactly the score /simulate stores for the same plan
+    rounded = np.round(values, 2)
+    health_scores = np.empty((len(evaluators), growth_rates.shape[1]))
+    for c, (evaluator, city_rows) in enumerate(zip(evaluators, rows)):
+        health_scores[c] = evaluator.score(rounded[c, city_rows])
+
+    return parameter_ids, growth_rates, values, health_scores, rows
+
+def sweep_axis_values(axis):
+    """The growth rates one sweep axis takes: explicit `values`, or `steps` evenly spaced from `start` to `stop`."""
+    if axis.get("values"):
+        return np.array(axis["values"], dtype=float)
+    if axis.get("start") is not None and axis.get("stop") is not None:
+        return np.linspace(axis["start"], axis["stop"], axis["steps"])
+    raise ValueError(f"Sweep axis for parameter {axis['parameter_id']} needs values or start and stop")
+
+class StageRateKernel:
+    """Final-term simulation of a profile with some `(stage_number, parameter_id)` growth rates left free.
+
+    Only final values are needed, so each stage's growth is folded into a
+    single factor `(1 + rate / 100) ** terms`. Everything that is not free is
+    multiplied into `fixed_values` once; evaluating a candidate then costs one
+    multiply per free rate, for any number of candidates at a time.
+    """
+
+    def __init__(self, evaluator, stages, free):
+        index = {str(param_id): i for i, param_id in enumerate(evaluator.parameter_ids)}
+        stage_index = {stage["stage_number"]: s for s, stage in enumerate(stages)}
+        rates, _, _ = stage_rate_distributions(evaluator.parameter_ids, stages, [])
+        terms = np.array([stage["terms"] for stage in stages], dtype=float)
+        stage_factors = (1 + rates / 100) ** terms[:, None]
+
+        self.evaluator = evaluator
+        self.rows = []
+        self.terms = []
+        self.baseline_rates = []
+        self.baseline_factors = []
+        seen = set()
+        for item in free:
+            s = stage_index.get(item["stage_number"])
+            if s is None:
+                raise ValueError(f"Unknown stage_number {item['stage_number']}")
+            row = index.get(str(item["parameter_id"]))
+            if row is None:
+                raise ValueError(f"Parameter {item['parameter_id']} is not part of the city profile")
+            if (s, row) in seen:
+                raise ValueError(f"Parameter {item['parameter_id']} is given twice for stage {item['stage_number']}")
+            seen.add((s, row))
+
+            self.rows.append(row)
+            self.terms.append(terms[s])
+            self.baseline_rates.append(float(rates[s, row]))
+            self.baseline_factors.append(stage_factors[s, row])
+            stage_factors[s, row] = 1
+
+        self.fixed_values = evaluator.base_values * stage_factors.prod(axis=0)
+
+    def final_values(self, rates):
+        """Final parameter values for a free-rates x candidates array, as parameters x candidates."""
+        values = np.repeat(self.fixed_values[:, None], rates.shape[1], axis=1)
+        for row, terms, candidate_rates in zip(self.rows, self.terms, rates):
+            values[row] *= (1 + candidate_rates / 100) ** terms
+        return values
+
+    def baseline_values(self, skip=None):
+        values = self.fixed_values.copy()
+        for a, (row, factor) in enumerate(zip(self.rows, self.baseline_factors)):
+            if a != skip:
+                values[row] *= factor
+        return values
+
+    def baseline_score(self):
+        """Final health score with every free rate at the snapshot's own growth rate."""
+        return float(self.evaluator.score(np.round(self.baseline_values()[:, None], 2))[0])
+
+class SweepPlan(StageRateKernel):
+    """Grid of growth rates over chosen `(stage_number, parameter_id)` axes, compiled for one profile.
+
+    Points are numbered in C order over the axes so any range of them can be
+    scored independently, e.g. in another process.
+    """
+
+    def __init__(self, evaluator, stages, axes):
+        super().__init__(evaluator, stages, axes)
+        self.values = [sweep_axis_values(axis) for axis in axes]
+        self.factors = [(1 + values / 100) ** terms for values, terms in zip(self.values, self.terms)]
+        self.shape = tuple(len(values) for values in self.values)
+        self.points = int(np.prod(self.shape))
+
+    @timed(simulation_seconds.labels("sweep"))
+    def scores(self, start=0, stop=None, block_elements=8_000_000):
+        """Final health scores of grid points `start` to `stop`, simulated in bounded blocks."""
+        stop = self.points if stop is None else stop
+        scores = np.empty(stop - start)
+        block_points = max(1, block_elements // max(1, len(self.fixed_values)))
+
+        for lo in range(start, stop, block_points):
+            hi = min(stop, lo + block_points)
+            positions = np.unravel_index(np.arange(lo, hi), self.shape)
+            values = np.repeat(self.fixed_values[:, None], hi - lo, axis=1)
+            for row, factors, position in zip(self.rows, self.factors, positions):
+                values[row] *= factors[position]
+            scores[lo - start:hi - start] = self.evaluator.score(np.round(values, 2))
+
+        return scores
+
+    def rates_at(self, point):
+        """The swept growth rates of one grid point, in axis order."""
+        positions = np.unravel_index(point, self.shape)
+        return [float(values[position]) for values, position in zip(self.values, positions)]
+
+    def one_at_a_time(self, a):
+        """Final health scores along axis `a` with every other axis at its baseline rate."""
+        values = np.repeat(self.baseline_values(skip=a)[:, None], len(self.values[a]), axis=1)
+        values[self.rows[a]] *= self.factors[a]
+        return self.evaluator.score(np.round(values, 2))
+
+def apply_stage_rates(stages, free, rates):
+    """Copy of `stages` with each free `(stage_number, parameter_id)` set to its rate."""
+    stages = [{**stage, "parameters": [dict(param) for param in stage["parameters"]]} for stage in stages]
+    by_number = {stage["stage_number"]: stage for stage in stages}
+    for item, rate in zip(free, rates):
+        stage = by_number[item["stage_number"]]
+        for param in stage["parameters"]:
+            if str(param["parameter_id"]) == str(item["parameter_id"]):
+                param["growth_rate"] = rate
                 break
-        
-        if base_value is None or base_value == 0:
-            continue
-        
-        relative_change = (param_value / base_value) - 1
-        
-        weight = 1
-        total_weight += weight
-        
-        if param_id.endswith("GDP") or param_id.endswith("INVEST"):
-            factor = 1 if relative_change > 0 else -1
-        elif param_id.endswith("UNEMP") or param_id.endswith("INFL"):
-            factor = -1 if relative_change > 0 else 1
         else:
-            factor = 1 if relative_change > 0 else -1
-        
-        weighted_sum += factor * weight * abs(relative_change) * 50
-    
-    if total_weight == 0:
-        return 50 
-    
-    health_score = 50 + (weighted_sum / total_weight)
-    
-    return max(0, min(100, health_score))
\ No newline at end of file
+            stage["parameters"].append({"parameter_id": item["parameter_id"], "growth_rate": rate})
+    return stages
+
+@timed(simulation_seconds.labels("optimize"))
+def optimize_stage_rates(kernel, lower, upper, target_row=None, at_least=None, at_most=None,
+                         population=256, iterations=40, seed=None, elite_fraction=0.1):
+    """Cross-entropy search for the free rates that meet a target with the smallest total change.
+
+    The target is the final health score, or the final (rounded) value of the
+    parameter in `target_row`, bounded by `at_least` and/or `at_most`.
+    Candidates are ranked by target violation first and by the sum of absolute
+    changes from the snapshot's own rates second. Each iteration evaluates a
+    whole population in one kernel call, then refits a normal sampling
+    distribution to the best `elite_fraction` of it. The snapshot's own rates
+    (clipped to the bounds) are always among the first candidates.
+
+    Returns `(rates, metric, violation, change, evaluations, iterations_run)`.
+    """
+    lower = np.asarray(lower, dtype=float)
+    upper = np.asarray(upper, dtype=float)
+    if np.any(lower > upper):
+        raise ValueError("Every free growth rate needs min <= max")
+    if at_least is None and at_most is None:
+        raise ValueError("The target needs at_least or at_most")
+
+    baseline = np.array(kernel.baseline_rates)
+    rng = np.random.default_rng(seed)
+    n_elite = max(2, int(population * elite_fraction))
+
+    def evaluate(candidates):
+        values = np.round(kernel.final_values(candidates), 2)
+        metric = kernel.evaluator.score(values) if target_row is None else values[target_row]
+        violation = np.zeros_like(metric)
+        if at_least is not None:
+            violation += np.maximum(0, at_least - metric)
+        if at_most is not None:
+            violation += np.maximum(0, metric - at_most)
+        change = np.abs(candidates - baseline[:, None]).sum(axis=0)
+        return metric, violation, change
+
+    mean = np.clip(baseline, lower, upper)
+    std = (upper - lower) / 2
+    best = None
+    evaluations = 0
+    iterations_run = 0
+
+    for iteration in range(iterations):
+        candidates = rng.normal(mean[:, None], std[:, None], (len(mean), population))
+        np.clip(candidates, lower[:, None], upper[:, None], out=candidates)
+        if iteration == 0:
+            candidates[:, 0] = mean
+        metric, violation, change = evaluate(candidates)
+        evaluations += population
+        iterations_run += 1
+
+        order = np.lexsort((change, violation))
+        top = order[0]
+        if best is None or (violation[top], change[top]) < (best[2], best[3]):
+            best = (candidates[:, top].copy(), float(metric[top]), float(violation[top]), float(change[top]))
+
+        elites = candidates[:, order[:n_elite]]
+        mean = 0.7 * elites.mean(axis=1) + 0.3 * mean
+        std = 0.7 * elites.std(axis=1) + 0.3 * std
+        if np.all(std < 1e-4):
+            break
+
+    rates, metric, violation, change = best
+    return rates, metric, violation, change, evaluations, iterations_run
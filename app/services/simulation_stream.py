@@ -0,0 +1,77 @@
+import asyncio
+from bson import ObjectId
+from app.repositories import storage
+from app.services.analysis_jobs import analysis_jobs
+from app.services.simulation import iter_simulation_blocks, cursor_state
+
+async def write_results(snapshot_id, queue):
+    """Append blocks of term results from `queue` to the snapshot until a None arrives.
+
+    Whatever has queued up while the previous write was in flight goes out
+    as one write, so a fast producer costs few round trips.
+    """
+    written = 0
+    finished = False
+    while not finished:
+        batch = []
+        block = await queue.get()
+        while block is not None:
+            batch.extend(block)
+            if queue.empty():
+                break
+            block = queue.get_nowait()
+        finished = block is None
+
+        if batch:
+            written += len(batch)
+            await storage.snapshots.append_results(
+                snapshot_id, batch, {"results_count": written, "cursor": cursor_state(batch[-1])}
+            )
+    return written
+
+async def stream_simulation(snapshot, city_profile, evaluator, block_terms, analysis_timeout=None):
+    """Simulate a snapshot block by block, yielding `(event, data)` pairs as soon as each is ready.
+
+    Events are `results` (a block of term results), `completed` once every
+    term is stored, and finally `analysis`, or `analysis_pending` with the
+    job id if the AI analysis takes longer than `analysis_timeout` seconds.
+    Blocks are stored in the background while the next ones are computed.
+    If the client goes away early, the terms computed so far are still
+    stored and the snapshot stays incomplete, so /advance can carry on.
+    """
+    job_id = ObjectId()
+    await storage.snapshots.update(snapshot["_id"], {
+        "results": [],
+        "results_count": 0,
+        "cursor": None,
+        "ai_analysis": None,
+        "ai_analysis_job_id": job_id,
+        "is_completed": False
+    })
+
+    queue = asyncio.Queue()
+    writer = asyncio.create_task(write_results(snapshot["_id"], queue))
+    results = []
+    try:
+        for block in iter_simulation_blocks(evaluator, snapshot["stages"], block_terms):
+            results.extend(block)
+            queue.put_nowait(block)
+            yield "results", block
+    finally:
+        queue.put_nowait(None)
+        written = await asyncio.shield(writer)
+
+    await storage.snapshots.update(snapshot["_id"], {"is_completed": True})
+    await analysis_jobs.submit(job_id, snapshot, city_profile, results)
+    yield "completed", {
+        "snapshot_id": snapshot["_id"],
+        "terms": written,
+        "is_completed": True,
+        "ai_analysis_job_id": job_id
+    }
+
+    analysis = await analysis_jobs.wait(job_id, analysis_timeout)
+    if analysis is None:
+        yield "analysis_pending", {"ai_analysis_job_id": job_id}
+    else:
+        yield "analysis", {"ai_analysis": analysis}
@@ -0,0 +1,49 @@
+import asyncio
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.core.config import SWEEP_WORKERS, SWEEP_PROCESS_THRESHOLD, MONTE_CARLO_BLOCK_ELEMENTS
+
+class SweepRunner:
+    """Scores SweepPlan grids, in a worker thread for small grids and across a process pool for large ones.
+
+    The pool is created on first use with the spawn start method, so workers
+    do not inherit the event loop or database client threads, and is shut
+    down with the app. Either way the event loop keeps serving other
+    requests while a grid is scored.
+    """
+
+    def __init__(self, workers=SWEEP_WORKERS, process_threshold=SWEEP_PROCESS_THRESHOLD,
+                 block_elements=MONTE_CARLO_BLOCK_ELEMENTS):
+        self.workers = workers
+        self.process_threshold = process_threshold
+        self.block_elements = block_elements
+        self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.pool
+
+    async def run(self, plan):
+        """Final health scores of every grid point, flattened in C order over the axes."""
+        if plan.points < self.process_threshold or self.workers < 2:
+            return await asyncio.to_thread(plan.scores, 0, plan.points, self.block_elements)
+
+        loop = asyncio.get_running_loop()
+        chunk = math.ceil(plan.points / self.workers)
+        chunks = [
+            loop.run_in_executor(
+                self.get_pool(), plan.scores, start, min(plan.points, start + chunk), self.block_elements
+            )
+            for start in range(0, plan.points, chunk)
+        ]
+        return np.concatenate(await asyncio.gather(*chunks))
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+sweep_runner = SweepRunner()
@@ -1,7 +1,15 @@
 from bson import ObjectId
+from fastapi import HTTPException
+from app.core.metrics import serialization_seconds
+from app.repositories import BulkInsertError
+from app.utils.metrics import timed
 
+@timed(serialization_seconds.labels("serialize_mongo_doc"))
 def serialize_mongo_doc(doc):
     """Recursively convert all ObjectIds to strings in a MongoDB document."""
+    return _serialize_doc(doc)
+
+def _serialize_doc(doc):
     if doc is None:
         return None
     
@@ -12,12 +20,22 @@ def serialize_mongo_doc(doc):
         elif isinstance(value, ObjectId):
             result[key] = str(value)
         elif isinstance(value, list):
-            result[key] = [serialize_mongo_doc(item) if isinstance(item, dict) 
+            result[key] = [_serialize_doc(item) if isinstance(item, dict) 
                           else str(item) if isinstance(item, ObjectId)
                           else item for item in value]
         elif isinstance(value, dict):
-            result[key] = serialize_mongo_doc(value)
+            result[key] = _serialize_doc(value)
         else:
             result[key] = value
     
-    return result
\ No newline at end of file
+    return result
+
+async def insert_documents(repository, documents):
+    """Insert documents in one unordered bulk write and return them with their `_id`s.
+
+    A write error becomes a 400 listing each failed document's index.
+    """
+    try:
+        return await repository.insert_many(documents)
+    except BulkInsertError as e:
+        raise HTTPException(400, {"inserted": e.inserted, "errors": e.errors})
@@ -0,0 +1,50 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from app.core.config import LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT
+from app.utils.responses import MongoJSONResponse, dumps_mongo
+
+def parse_projection(fields, default=None):
+    """Turn a `fields=a,b` query value into a Mongo projection (`_id` is always returned)."""
+    if not fields:
+        return default
+    return {field.strip(): 1 for field in fields.split(",") if field.strip()}
+
+def parse_cursor(cursor):
+    """Decode the `_id` a keyset page resumes after."""
+    if not cursor:
+        return None
+    try:
+        return ObjectId(cursor)
+    except InvalidId:
+        raise HTTPException(400, "Invalid cursor")
+
+async def stream_ndjson(documents):
+    async for doc in documents:
+        yield dumps_mongo(doc) + b"\n"
+
+async def list_documents(repository, filter_query, cursor=None, limit=None, projection=None, format="json"):
+    """List a repository in `_id` order, one keyset page at a time.
+
+    In JSON mode a page holds up to `limit` documents and the `_id` to resume
+    from is returned in the `X-Next-Cursor` header. In NDJSON mode documents
+    are written to the response as the storage cursor yields them, with no
+    limit unless one is given.
+    """
+    after = parse_cursor(cursor)
+
+    if format == "ndjson":
+        documents = repository.find(filter_query, after, limit, projection)
+        return StreamingResponse(stream_ndjson(documents), media_type="application/x-ndjson")
+    if format != "json":
+        raise HTTPException(400, "format must be json or ndjson")
+
+    limit = min(limit or LIST_DEFAULT_LIMIT, LIST_MAX_LIMIT)
+    documents = await repository.find_page(filter_query, after, limit + 1, projection)
+    headers = {}
+    if len(documents) > limit:
+        documents = documents[:limit]
+        headers["X-Next-Cursor"] = str(documents[-1]["_id"])
+
+    return MongoJSONResponse(documents, headers=headers)
@@ -0,0 +1,60 @@
+import json
+from datetime import date, datetime
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from app.core.metrics import serialization_seconds
+from app.utils.metrics import timed
+
+try:
+    import orjson
+except ImportError:  # optional, install separately for the faster backend
+    orjson = None
+
+def _encode_default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def public_id(doc):
+    """Rename a document's own `_id` to `id`, without copying or walking nested values."""
+    if isinstance(doc, dict) and "_id" in doc:
+        return {("id" if key == "_id" else key): (str(value) if key == "_id" else value) for key, value in doc.items()}
+    return doc
+
+@timed(serialization_seconds.labels("dumps_mongo"))
+def dumps_mongo(content):
+    """Encode Mongo documents straight to JSON bytes in one pass.
+
+    ObjectIds become strings and datetimes ISO 8601 strings during encoding,
+    and a top-level `_id` (of the document, or of each document in a list) is
+    renamed to `id`, matching `serialize_mongo_doc` for this app's documents.
+    """
+    if isinstance(content, list):
+        content = [public_id(doc) for doc in content]
+    else:
+        content = public_id(content)
+
+    if orjson is not None:
+        return orjson.dumps(content, default=_encode_default)
+    return json.dumps(content, default=_encode_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class MongoJSONResponse(JSONResponse):
+    """JSON response for raw Mongo documents.
+
+    Returning one from a route skips `serialize_mongo_doc`, `jsonable_encoder`
+    and `response_model` validation, which would otherwise each walk the
+    whole document.
+    """
+
+    def render(self, content):
+        return dumps_mongo(content)
+
+async def encode_events(events, format="sse"):
+    """Frame `(event, data)` pairs as server-sent events, or as NDJSON lines of `{"event", "data"}`."""
+    async for event, data in events:
+        if format == "sse":
+            yield b"event: " + event.encode() + b"\ndata: " + dumps_mongo(data) + b"\n\n"
+        else:
+            yield dumps_mongo({"event": event, "data": data}) + b"\n"
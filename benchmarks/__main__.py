@@ -0,0 +1,91 @@
+"""Run the benchmark suite and optionally gate on a stored baseline.
+
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --baseline baseline.json --threshold 0.25
+
+The report is JSON. With --baseline the run exits with status 1 when any
+benchmark's best per-call time is more than --threshold slower than in the
+baseline. Compare reports taken with the same dataset sizes on the same
+machine.
+"""
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime
+import numpy as np
+from app.utils.responses import orjson
+from benchmarks import micro, routes, startup
+from benchmarks.compare import compare, format_comparison
+from benchmarks.data import generate_dataset
+
+SUITES = {"micro": micro.run, "routes": routes.run, "startup": startup.run}
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", choices=sorted(SUITES), action="append",
+                        help="suite to run; repeat for several (default: all)")
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--parameters", type=int, default=10, help="parameters per city profile")
+    parser.add_argument("--stages", type=int, default=2)
+    parser.add_argument("--terms", type=int, default=12, help="terms per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--number", type=int, default=20, help="calls per timing sample")
+    parser.add_argument("--repeat", type=int, default=5, help="timing samples per benchmark")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before a benchmark counts as regressed")
+    parser.add_argument("--min-seconds", type=float, default=0.0,
+                        help="do not gate on benchmarks faster than this in the baseline")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = {
+        "cities": args.cities,
+        "parameters": args.parameters,
+        "stages": args.stages,
+        "terms": args.terms,
+        "seed": args.seed
+    }
+    dataset = generate_dataset(**config)
+
+    benchmarks = {}
+    for suite in args.suite or sorted(SUITES):
+        benchmarks.update(SUITES[suite](dataset, args.number, args.repeat))
+
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "json_backend": "orjson" if orjson is not None else "json",
+            "machine": platform.machine()
+        },
+        "dataset": config,
+        "benchmarks": benchmarks
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("dataset") != config:
+            print("Warning: baseline was taken with different dataset sizes", file=sys.stderr)
+        rows = compare(report, baseline, args.threshold, args.min_seconds)
+        print(format_comparison(rows), file=sys.stderr)
+        regressed = [row["name"] for row in rows if row["regressed"]]
+        if regressed:
+            print(f"Regressed past {args.threshold:.0%}: {', '.join(regressed)}", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
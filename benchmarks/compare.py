@@ -0,0 +1,34 @@
+def compare(report, baseline, threshold=0.25, min_seconds=0.0):
+    """Compare a benchmark report against a stored baseline report.
+
+    A benchmark regresses when its best per-call time grew by more than
+    `threshold` (0.25 = 25% slower). Benchmarks faster than `min_seconds` in
+    the baseline are too noisy to gate on and are only reported. Benchmarks
+    missing from either side are skipped.
+    """
+    current = report["benchmarks"]
+    previous = baseline["benchmarks"]
+
+    rows = []
+    for name in sorted(set(current) & set(previous)):
+        before = previous[name]["seconds"]
+        after = current[name]["seconds"]
+        ratio = after / before if before else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_seconds": before,
+            "seconds": after,
+            "ratio": ratio,
+            "regressed": ratio > 1 + threshold and before >= min_seconds
+        })
+    return rows
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'ratio':>7}"]
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        lines.append(
+            f"{row['name']:<40} {row['baseline_seconds'] * 1e3:>10.3f}ms "
+            f"{row['seconds'] * 1e3:>10.3f}ms {row['ratio']:>6.2f}x{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,135 @@
+"""Deterministic synthetic countries, cities, parameters, profiles and snapshots.
+
+The same arguments always produce the same documents, ids included, so
+benchmark runs on different machines and commits measure the same work.
+"""
+import random
+from datetime import datetime
+from bson import ObjectId
+
+PARAMETER_TEMPLATES = [
+    ("GDP Growth Rate", "GDP", "%", "Growth"),
+    ("Unemployment Rate", "UNEMP", "%", "Employment"),
+    ("Inflation Rate", "INFL", "%", "Monetary"),
+    ("Foreign Investment", "INVEST", "$ Billion", "Investment"),
+    ("Tax Revenue", "TAX", "$ Billion", "Fiscal"),
+    ("Housing Price Index", "HOUSE", "Index", "Real Estate")
+]
+
+CREATED_AT = datetime(2024, 1, 1)
+
+class IdSequence:
+    """Hands out increasing ObjectIds so keyset pagination sees insertion order."""
+
+    def __init__(self):
+        self.counter = 0
+
+    def next(self):
+        self.counter += 1
+        return ObjectId(f"{self.counter:024x}")
+
+def generate_dataset(cities=10, parameters=10, stages=2, terms=12, history=12, seed=0):
+    """Build one profile and one snapshot per city; each snapshot has `stages` stages of `terms` terms."""
+    rng = random.Random(seed)
+    ids = IdSequence()
+
+    countries = [
+        {"_id": ids.next(), "name": f"Country {i}", "code": f"C{i}", "flag_url": None, "description": None}
+        for i in range(max(1, cities // 10))
+    ]
+
+    parameter_docs = []
+    for i in range(parameters):
+        name, code, unit, category = PARAMETER_TEMPLATES[i % len(PARAMETER_TEMPLATES)]
+        if i >= len(PARAMETER_TEMPLATES):
+            name, code = f"{name} {i}", f"{code}{i}"
+        parameter_docs.append({
+            "_id": ids.next(),
+            "name": name,
+            "code": code,
+            "unit": unit,
+            "description": None,
+            "category": category
+        })
+
+    city_docs = []
+    profiles = []
+    snapshots = []
+    for i in range(cities):
+        city = {
+            "_id": ids.next(),
+            "name": f"City {i}",
+            "country_id": countries[i % len(countries)]["_id"],
+            "description": None,
+            "population": rng.randint(100000, 10000000),
+            "image_url": None
+        }
+        city_docs.append(city)
+
+        profile_parameters = []
+        for param in parameter_docs:
+            base_value = round(rng.uniform(1, 500), 2)
+            profile_parameters.append({
+                "parameter_id": param["_id"],
+                "base_value": base_value,
+                "default_growth_rate": round(rng.uniform(-1, 3), 2),
+                "historical_values": [
+                    {
+                        "term": term,
+                        "value": round(base_value * (1 + rng.uniform(-0.05, 0.05)), 2),
+                        "growth_rate": round(rng.uniform(-2, 5), 2),
+                        "date": f"2023-{(term - 1) % 12 + 1:02d}-01"
+                    }
+                    for term in range(1, history + 1)
+                ]
+            })
+        profiles.append({
+            "_id": ids.next(),
+            "city_id": city["_id"],
+            "last_updated": CREATED_AT,
+            "parameters": profile_parameters,
+            "economic_health_score": 50.0,
+            "summary": None
+        })
+
+        snapshots.append({
+            "_id": ids.next(),
+            "name": f"City {i} plan",
+            "city_id": city["_id"],
+            "created_at": CREATED_AT,
+            "stages": [
+                {
+                    "stage_number": stage_number,
+                    "terms": terms,
+                    "parameters": [
+                        {"parameter_id": param["_id"], "growth_rate": round(rng.uniform(-3, 5), 2)}
+                        for param in parameter_docs
+                    ]
+                }
+                for stage_number in range(1, stages + 1)
+            ],
+            "results": [],
+            "results_count": 0,
+            "is_completed": False
+        })
+
+    return {
+        "countries": countries,
+        "cities": city_docs,
+        "parameters": parameter_docs,
+        "city_profiles": profiles,
+        "snapshots": snapshots
+    }
+
+async def load_dataset(backend, dataset):
+    """Insert a generated dataset into a storage backend's repositories."""
+    for kind, documents in dataset.items():
+        await getattr(backend, kind).insert_many([dict(document) for document in documents])
+    return backend
+
+def parameter_metadata(dataset):
+    """The catalog entries HealthEvaluator expects, keyed by parameter id string."""
+    return {
+        str(param["_id"]): {"code": param["code"], "category": param["category"]}
+        for param in dataset["parameters"]
+    }
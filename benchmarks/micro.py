@@ -0,0 +1,73 @@
+"""Micro-benchmarks of the simulation engine, history analytics, health scoring and serializers.
+
+Everything runs in-process on the synthetic dataset (one city, or every city for
+the batch engine and history analytics); no storage is involved.
+"""
+import numpy as np
+from app.core.config import HEALTH_CATEGORY_WEIGHTS, HEALTH_CATEGORY_DIRECTIONS
+from app.services.simulation import (
+    HealthEvaluator, stage_growth_matrix, simulate_values, run_simulation, run_batch_simulation, SweepPlan,
+    StageRateKernel, optimize_stage_rates
+)
+from app.services.history import history_documents
+from app.utils.helpers import serialize_mongo_doc
+from app.utils.responses import dumps_mongo
+from benchmarks.data import parameter_metadata
+from benchmarks.timing import measure
+
+def run(dataset, number=20, repeat=5):
+    profile = dataset["city_profiles"][0]
+    snapshot = dict(dataset["snapshots"][0])
+    metadata = parameter_metadata(dataset)
+
+    def compile_evaluator():
+        return HealthEvaluator(profile, metadata, HEALTH_CATEGORY_WEIGHTS, HEALTH_CATEGORY_DIRECTIONS)
+
+    evaluator = compile_evaluator()
+    evaluators = [
+        HealthEvaluator(city_profile, metadata, HEALTH_CATEGORY_WEIGHTS, HEALTH_CATEGORY_DIRECTIONS)
+        for city_profile in dataset["city_profiles"]
+    ]
+    growth_rates = stage_growth_matrix(evaluator.parameter_ids, snapshot["stages"])
+    values = np.round(simulate_values(evaluator.base_values, growth_rates), 2)
+
+    sweep_axes = [
+        {"stage_number": stage["stage_number"], "parameter_id": stage["parameters"][0]["parameter_id"],
+         "start": -5, "stop": 5, "steps": 50}
+        for stage in snapshot["stages"]
+    ]
+    sweep_plan = SweepPlan(evaluator, snapshot["stages"], sweep_axes)
+    kernel = StageRateKernel(evaluator, snapshot["stages"], sweep_axes)
+    target = kernel.baseline_score() + 5
+
+    results = run_simulation(evaluator, snapshot["stages"])
+    snapshot.update({"results": results, "results_count": len(results), "is_completed": True})
+
+    return {
+        "engine.stage_growth_matrix": measure(
+            lambda: stage_growth_matrix(evaluator.parameter_ids, snapshot["stages"]), number, repeat
+        ),
+        "engine.simulate_values": measure(
+            lambda: simulate_values(evaluator.base_values, growth_rates), number, repeat
+        ),
+        "engine.run_simulation": measure(
+            lambda: run_simulation(evaluator, snapshot["stages"]), number, repeat
+        ),
+        "engine.run_batch_simulation": measure(
+            lambda: run_batch_simulation(evaluators, snapshot["stages"]), number, repeat
+        ),
+        "engine.sweep_scores": measure(sweep_plan.scores, number, repeat),
+        "engine.optimize_stage_rates": measure(
+            lambda: optimize_stage_rates(
+                kernel, [-10] * len(sweep_axes), [30] * len(sweep_axes), at_least=target, iterations=20, seed=0
+            ),
+            number, repeat
+        ),
+        "history.history_documents": measure(
+            lambda: history_documents(dataset["city_profiles"], {}), number, repeat
+        ),
+        "scoring.compile_evaluator": measure(compile_evaluator, number, repeat),
+        "scoring.score": measure(lambda: evaluator.score(values), number, repeat),
+        "serialization.serialize_mongo_doc": measure(lambda: serialize_mongo_doc(snapshot), number, repeat),
+        "serialization.dumps_mongo": measure(lambda: dumps_mongo(snapshot), number, repeat)
+    }
@@ -0,0 +1,67 @@
+"""End-to-end route benchmarks through an in-process ASGI client.
+
+The app runs against a MemoryStorage loaded with the synthetic dataset and a
+StubLLMClient, so the numbers cover routing, validation, the engine and
+serialization without network, database or LLM latency.
+"""
+import asyncio
+import httpx
+from app.main import app
+from app.repositories import storage
+from app.repositories.memory import MemoryStorage
+from app.services import ai_analysis
+from app.services.analysis_jobs import analysis_jobs
+from app.services.llm import StubLLMClient
+from app.services.parameter_catalog import parameter_catalog
+from benchmarks.data import load_dataset
+from benchmarks.timing import measure_async
+
+async def run_routes(dataset, number=20, repeat=5, monte_carlo_paths=1000):
+    previous_backend = storage._backend
+    previous_client = ai_analysis.llm_client
+    await load_dataset(storage.use(MemoryStorage()), dataset)
+    parameter_catalog.invalidate()
+    ai_analysis.set_llm_client(StubLLMClient(delay=0))
+    await analysis_jobs.start()
+
+    snapshot_id = str(dataset["snapshots"][0]["_id"])
+    city_id = str(dataset["cities"][0]["_id"])
+
+    async def call(client, method, url, **kwargs):
+        response = await client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            routes = {
+                "routes.list_snapshots": lambda: call(client, "GET", "/snapshots/", params={"limit": 100}),
+                "routes.list_snapshots_ndjson": lambda: call(client, "GET", "/snapshots/", params={"format": "ndjson"}),
+                "routes.get_city_profile": lambda: call(client, "GET", f"/city-profiles/{city_id}"),
+                "routes.simulate": lambda: call(client, "POST", f"/snapshots/{snapshot_id}/simulate"),
+                "routes.simulate_stream": lambda: call(
+                    client, "POST", f"/snapshots/{snapshot_id}/simulate/stream", params={"format": "ndjson"}
+                ),
+                "routes.get_snapshot": lambda: call(client, "GET", f"/snapshots/{snapshot_id}"),
+                "routes.advance": lambda: call(
+                    client, "POST", f"/snapshots/{snapshot_id}/advance", json={"current_term": 1}
+                ),
+                "routes.monte_carlo": lambda: call(
+                    client, "POST", f"/snapshots/{snapshot_id}/monte-carlo",
+                    json={"paths": monte_carlo_paths, "seed": 1}
+                )
+            }
+            results = {}
+            for name, request in routes.items():
+                results[name] = await measure_async(request, number, repeat)
+                await analysis_jobs.queue.join()
+            return results
+    finally:
+        await analysis_jobs.stop()
+        storage.use(previous_backend)
+        ai_analysis.set_llm_client(previous_client)
+        parameter_catalog.invalidate()
+
+def run(dataset, number=20, repeat=5, monte_carlo_paths=1000):
+    return asyncio.run(run_routes(dataset, number, repeat, monte_carlo_paths))
@@ -0,0 +1,64 @@
+"""Compare the old and new response serialization paths on large snapshot documents.
+
+Run with `python -m benchmarks.serialization [terms] [parameters]`.
+"""
+import json
+import sys
+import timeit
+from datetime import datetime
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from app.utils.helpers import serialize_mongo_doc
+from app.utils.responses import dumps_mongo, orjson
+
+def make_snapshot(terms, parameters):
+    parameter_ids = [ObjectId() for _ in range(parameters)]
+    return {
+        "_id": ObjectId(),
+        "name": "Benchmark snapshot",
+        "city_id": ObjectId(),
+        "created_at": datetime.now(),
+        "stages": [{
+            "stage_number": 1,
+            "terms": terms,
+            "parameters": [{"parameter_id": param_id, "growth_rate": 1.5} for param_id in parameter_ids]
+        }],
+        "results": [
+            {
+                "term": term,
+                "parameters": [
+                    {"parameter_id": param_id, "value": 100.0 + term, "growth_rate": 1.5}
+                    for param_id in parameter_ids
+                ],
+                "economic_health_score": 55.0
+            }
+            for term in range(1, terms + 1)
+        ],
+        "results_count": terms,
+        "is_completed": True
+    }
+
+def encode_previous(snapshot):
+    # serialize_mongo_doc, then jsonable_encoder (which response_model
+    # validation and JSONResponse both go through), then json.dumps
+    return json.dumps(jsonable_encoder(serialize_mongo_doc(snapshot)), ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+def run(terms=2000, parameters=10, repeat=5):
+    snapshot = make_snapshot(terms, parameters)
+    assert json.loads(encode_previous(snapshot)) == json.loads(dumps_mongo(snapshot))
+
+    previous = min(timeit.repeat(lambda: encode_previous(snapshot), number=1, repeat=repeat))
+    current = min(timeit.repeat(lambda: dumps_mongo(snapshot), number=1, repeat=repeat))
+    return {
+        "terms": terms,
+        "parameters": parameters,
+        "backend": "orjson" if orjson is not None else "json",
+        "previous_seconds": previous,
+        "mongo_json_seconds": current,
+        "speedup": previous / current
+    }
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    print(json.dumps(run(*args), indent=2))
@@ -0,0 +1,41 @@
+"""Cold-start benchmarks: importing the app and running its lifespan in a fresh interpreter.
+
+Every sample is a new process, so `number` is ignored. Storage is the memory
+backend, so the lifespan numbers cover client construction and imports but
+not the Mongo warm-up ping; the LLM client is whatever LLM_BACKEND selects.
+"""
+import json
+import os
+import subprocess
+import sys
+from benchmarks.timing import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def start_app():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(start_app())
+print(json.dumps({"import": imported - start, "lifespan": ready - imported, "total": ready - start}))
+"""
+
+def start_once():
+    env = {**os.environ, "STORAGE_BACKEND": "memory", "PARAMETER_CATALOG_WATCH": "false", "PYTHONPATH": ROOT}
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(dataset, number=20, repeat=5):
+    samples = [start_once() for _ in range(repeat)]
+    return {
+        f"startup.{phase}": summarize([sample[phase] for sample in samples], 1)
+        for phase in ("import", "lifespan", "total")
+    }
@@ -0,0 +1,44 @@
+import gc
+import statistics
+import time
+
+def summarize(samples, number):
+    """Per-call timings from `repeat` samples that each ran the call `number` times."""
+    per_call = [sample / number for sample in samples]
+    return {
+        "seconds": min(per_call),
+        "median_seconds": statistics.median(per_call),
+        "repeat": len(samples),
+        "number": number
+    }
+
+def measure(func, number=10, repeat=5):
+    """Time a function; `seconds` is the best per-call time, the least noisy estimate.
+
+    The garbage collector is paused while sampling, as timeit does.
+    """
+    func()
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append(time.perf_counter() - start)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return summarize(samples, number)
+
+async def measure_async(func, number=10, repeat=5):
+    """Like `measure` for a coroutine function."""
+    await func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            await func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, number)
@@ -0,0 +1,67 @@
+import random
+import numpy as np
+import pytest
+from bson import ObjectId
+from app.services.simulation import HealthEvaluator, run_simulation, iter_simulation_blocks
+
+def reference_score(parameters, city_profile):
+    """The original per-parameter health score loop, with every direction positive."""
+    total_weight = 0
+    weighted_sum = 0
+    for param in parameters:
+        base_value = next(
+            base["base_value"] for base in city_profile["parameters"] if base["parameter_id"] == param["parameter_id"]
+        )
+        if base_value == 0:
+            continue
+        relative_change = (param["value"] / base_value) - 1
+        total_weight += 1
+        factor = 1 if relative_change > 0 else -1
+        weighted_sum += factor * 1 * abs(relative_change) * 50
+    if total_weight == 0:
+        return 50
+    return max(0, min(100, 50 + (weighted_sum / total_weight)))
+
+def random_plan(rng, parameters, terms):
+    city_profile = {
+        "_id": ObjectId(),
+        "parameters": [
+            {
+                "parameter_id": ObjectId(),
+                "base_value": rng.choice([0, round(rng.uniform(0.1, 10000), 2)]),
+                "default_growth_rate": 1.0
+            }
+            for _ in range(parameters)
+        ]
+    }
+    stages = [{
+        "terms": terms,
+        "parameters": [
+            {"parameter_id": param["parameter_id"], "growth_rate": rng.uniform(-10, 10)}
+            for param in city_profile["parameters"]
+        ]
+    }]
+    return city_profile, stages
+
+@pytest.mark.parametrize("parameters", [8, 10, 16, 33])
+def test_scores_match_reference_loop_at_any_width(parameters):
+    rng = random.Random(parameters)
+    for _ in range(50):
+        city_profile, stages = random_plan(rng, parameters, rng.randint(1, 30))
+        evaluator = HealthEvaluator(city_profile, {})
+        results = run_simulation(evaluator, stages)
+        values = np.array([[param["value"] for param in result["parameters"]] for result in results]).T
+
+        expected = [reference_score(result["parameters"], city_profile) for result in results]
+        assert [result["economic_health_score"] for result in results] == expected
+        # One term at a time, as /advance scores
+        assert [float(evaluator.score(values[:, [t]])[0]) for t in range(values.shape[1])] == expected
+
+@pytest.mark.parametrize("block_terms", [1, 7])
+def test_streamed_blocks_match_simulate(block_terms):
+    rng = random.Random(block_terms)
+    for _ in range(50):
+        city_profile, stages = random_plan(rng, 10, rng.randint(1, 30))
+        evaluator = HealthEvaluator(city_profile, {})
+        streamed = [result for block in iter_simulation_blocks(evaluator, stages, block_terms) for result in block]
+        assert streamed == run_simulation(evaluator, stages)